@@ -0,0 +1,4 @@
+"""
+Motor de datos de los campogramas: ingesta de los ZIP de temporada y
+utilidades compartidas por las páginas de Streamlit.
+"""
@@ -0,0 +1,159 @@
+"""
+Percentiles aproximados con resúmenes de cuantiles fusionables.
+
+Para pools de muchas ligas (Liga / Competición vacía) el ranking exacto
+ordena todo el pool. En modo aproximado cada (temporada, liga, score)
+guarda un resumen de como mucho `PUNTOS_RESUMEN` tramos de sus valores
+ordenados (mínimo, máximo y nº de valores de cada tramo); el pool se
+arma fusionando los resúmenes de sus ligas (se ordenan unos cientos de
+tramos, no los jugadores):
+
+    rank ≈ Σ tramos enteros por debajo de X  +  ½ Σ tramos que contienen X  +  ½
+
+Los tramos con todos los valores iguales (empates) son exactos; solo los
+tramos "partidos" que contienen X (como mucho dos por liga) meten error,
+de como mucho la mitad de su tamaño cada uno. `error_maximo` da esa cota
+en puntos de percentil (antes de discretizar a saltos de 5) para
+enseñarla en la UI. El modo exacto sigue siendo el de por defecto.
+
+Como el rank estimado solo cambia en los extremos de los tramos y el
+percentil va en saltos de 5, cada score del pool se reduce a unos 20
+umbrales: el percentil de cada jugador es UN `searchsorted` sobre ellos
+(sin ranks por fila ni ordenar el pool).
+
+Es un resumen tipo "equi-depth" (sin dependencias nuevas) en lugar de un
+t-digest / KLL: con unos cientos de jugadores por liga da la misma cota
+con mucho menos código.
+"""
+import numpy as np
+import pandas as pd
+
+from motor.percentiles import _columna_float, columna_percentil, discretizar
+from motor.referencias import claves_orden
+from motor.roles import posiciones_rol
+
+
+# Tramos por (liga, score): cota ≈ 100 / PUNTOS_RESUMEN puntos por liga grande
+PUNTOS_RESUMEN = 64
+
+
+def resumen(valores: np.ndarray, puntos: int = PUNTOS_RESUMEN):
+    """
+    Resumen de una columna: (mínimos, máximos, tamaños) de como mucho
+    `puntos` tramos de sus valores ordenados (sin NaN), nº de valores y
+    error (nº de filas) que puede meter en un rank.
+    """
+    v = np.sort(valores[~np.isnan(valores)].astype(np.float32))
+    tam = max(1, -(-len(v) // puntos))
+    cortes = np.arange(0, len(v), tam)
+    minimos, maximos = v[cortes], v[np.minimum(cortes + tam, len(v)) - 1]
+    tamaños = np.diff(np.append(cortes, len(v)))
+    # dos tramos partidos (mín < máx) como mucho, ½ tramo cada uno
+    error = tam if (minimos < maximos).any() else 0
+    return (minimos, maximos, tamaños), len(v), error
+
+
+def escalones(tramos, total: int, step: int = 5):
+    """
+    Percentil (en saltos de `step`) de un pool a partir de los tramos
+    fusionados de sus ligas, como función escalonada del valor:
+    (umbrales, niveles) → percentil(X) = niveles[searchsorted(umbrales,
+    2·clave(X), "right")]. Un umbral par 2·clave(p) es "desde p"; uno
+    impar 2·clave(p) + 1, "justo después de p".
+    """
+    minimos = np.concatenate([t[0] for t in tramos])
+    maximos = np.concatenate([t[1] for t in tramos])
+    tamaños = np.concatenate([t[2] for t in tramos])
+    por_min = np.argsort(minimos, kind="stable")
+    por_max = np.argsort(maximos, kind="stable")
+    minimos, maximos = minimos[por_min], maximos[por_max]
+    acum_min = np.concatenate(([0], np.cumsum(tamaños[por_min])))
+    acum_max = np.concatenate(([0], np.cumsum(tamaños[por_max])))
+
+    # el rank estimado solo cambia en los extremos de los tramos
+    puntos = np.unique(np.concatenate([minimos, maximos]))
+    hasta = acum_min[np.searchsorted(minimos, puntos, side="right")]          # mín <= X
+    en_punto = acum_max[np.searchsorted(maximos, puntos, side="left")]        # máx < X = p
+    despues = acum_max[np.searchsorted(maximos, puntos, side="right")]        # máx < X (p < X < siguiente)
+
+    rangos = np.empty(2 * len(puntos) + 1)
+    rangos[0] = 0.5
+    rangos[1::2] = 0.5 + (en_punto + hasta) / 2
+    rangos[2::2] = 0.5 + (despues + hasta) / 2
+    niveles = discretizar(rangos, total, step=step)
+
+    claves = claves_orden(puntos).astype(np.uint64) * np.uint64(2)
+    umbrales = np.empty(2 * len(puntos), dtype=np.uint64)
+    umbrales[0::2] = claves
+    umbrales[1::2] = claves + np.uint64(1)
+
+    cambia = np.flatnonzero(np.diff(niveles) != 0)
+    return umbrales[cambia], np.concatenate((niveles[:1], niveles[1:][cambia]))
+
+
+class ResumenesCuantiles:
+    """
+    Resúmenes por (liga, score), solo entre los jugadores del rol de cada
+    score. Un pool de varias ligas fusiona los tramos de sus ligas. Se
+    construyen una vez por temporada y versión del dataset.
+    """
+
+    def __init__(self, df: pd.DataFrame, grupos, indice=None, puntos: int = PUNTOS_RESUMEN):
+        self.grupos = []
+        self.por_liga = {}  # liga → {score: (tramos, n, error)}
+
+        ligas = df["Nombre_Liga"].to_numpy()
+        for roles, scores in grupos:
+            scores = [c for c in scores if c in df.columns]
+            self.grupos.append((roles, scores))
+            pos = posiciones_rol(df, indice, *roles)
+            ligas_rol = ligas[pos]
+            ligas_distintas = pd.unique(ligas_rol[pd.notna(ligas_rol)])
+            for col in scores:
+                valores = _columna_float(df[col])[pos]
+                for liga in ligas_distintas:
+                    self.por_liga.setdefault(str(liga), {})[col] = resumen(
+                        valores[ligas_rol == liga], puntos
+                    )
+
+    def _datos(self, liga_sel, col) -> list:
+        return [self.por_liga[str(l)][col] for l in liga_sel if col in self.por_liga.get(str(l), {})]
+
+    def percentiles(self, df_scope: pd.DataFrame, liga_sel, indice=None, step: int = 5) -> pd.DataFrame:
+        """
+        Aproximación de `percentiles_por_rol(df_scope, grupos, ...)` cuando
+        `df_scope` son TODAS las filas de la partición de esas ligas.
+        """
+        n_filas = len(df_scope)
+        columnas = {}
+
+        for roles, scores in self.grupos:
+            pos = posiciones_rol(df_scope, indice, *roles)
+            if not len(pos):
+                continue
+            for col in scores:
+                datos = self._datos(liga_sel, col)
+                total = sum(n for _, n, _ in datos)
+                if not total:
+                    continue
+                umbrales, niveles = escalones([t for t, _, _ in datos], total, step=step)
+
+                x = _columna_float(df_scope[col])[pos].astype(np.float32)
+                nan = np.isnan(x)
+                claves = claves_orden(np.where(nan, 0, x)).astype(np.uint64) * np.uint64(2)
+                pct = niveles[np.searchsorted(umbrales, claves, side="right")]
+                pct[nan] = np.nan
+                columnas[f"Percentil {col}"] = columna_percentil(n_filas, pos, pct)
+
+        return pd.DataFrame(columnas, index=df_scope.index)
+
+    def error_maximo(self, liga_sel) -> float:
+        """Cota del error (puntos de percentil, antes de discretizar) del pool de esas ligas."""
+        peor = 0.0
+        for _, scores in self.grupos:
+            for col in scores:
+                datos = self._datos(liga_sel, col)
+                total = sum(n for _, n, _ in datos)
+                if total:
+                    peor = max(peor, sum(e for _, _, e in datos) / total * 100)
+        return peor
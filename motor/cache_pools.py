@@ -0,0 +1,223 @@
+"""
+Cachés de pools de percentiles.
+
+- `CachePools` (memoria): compartida por todas las sesiones. Un pool
+  depende solo de (temporada, categorías, ligas, versión del dataset):
+  diez usuarios mirando La Liga 2025 comparten UN DataFrame. Las sesiones
+  guardan solo la clave; el DataFrame vive aquí, es de SOLO LECTURA y se
+  expulsa por LRU cuando la caché pasa de su límite en bytes.
+
+- `CacheDiscoPools` (disco): los mismos pools en Parquet, para que un
+  reinicio o un redeploy no obligue a recalcularlos. La clave usa la
+  huella del ZIP de la temporada (no la versión en memoria, que se
+  reinicia) y el directorio se limita en tamaño con LRU por mtime.
+
+Orden de consulta: memoria → disco → cálculo.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# Límite de la caché en MB (OSAN_CACHE_POOLS_MB)
+ENV_CACHE_POOLS_MB = "OSAN_CACHE_POOLS_MB"
+CACHE_POOLS_MB = 256
+
+# Caché en disco: carpeta y límite en MB (OSAN_CACHE_DISCO_DIR / _MB)
+ENV_CACHE_DISCO_DIR = "OSAN_CACHE_DISCO_DIR"
+ENV_CACHE_DISCO_MB = "OSAN_CACHE_DISCO_MB"
+CACHE_DISCO_MB = 1024
+
+# Si cambia cómo se construye un pool, se ignoran los Parquet anteriores
+VERSION_POOL = 1
+
+
+def clave_seleccion(
+    temporada, categoria_sel, liga_sel, version: int, aproximado: bool = False, metricas: bool = False
+) -> tuple:
+    """
+    Clave normalizada: el orden en que se eligen ligas / categorías no
+    importa. El modo aproximado solo existe sin filtro de liga.
+    `metricas`: el pool trae también los percentiles de las métricas.
+    """
+    return (
+        str(temporada),
+        tuple(sorted(str(c) for c in categoria_sel or [])),
+        tuple(sorted(str(l) for l in liga_sel or [])),
+        version,
+        bool(aproximado) and not liga_sel,
+        bool(metricas),
+    )
+
+
+def _tamaño(valor) -> int:
+    """Bytes de un DataFrame o de cualquier objeto con `nbytes` (tablas precalculadas)."""
+    if hasattr(valor, "nbytes"):
+        return int(valor.nbytes)
+    return int(valor.memory_usage(deep=True).sum())
+
+
+class CachePools:
+    """LRU acotada en bytes, con contadores de aciertos / fallos."""
+
+    def __init__(self, max_bytes: int = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get(ENV_CACHE_POOLS_MB, CACHE_POOLS_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsados = 0
+
+        self._pools = OrderedDict()  # clave → (DataFrame, bytes)
+        self._lock = threading.Lock()
+        self._locks_calculo = {}
+
+    def obtener(self, clave: tuple, construir):
+        """
+        Pool de `clave`; si no está, `construir()` lo calcula (una sola vez
+        aunque lo pidan varias sesiones a la vez).
+        """
+        with self._lock:
+            if clave in self._pools:
+                self._pools.move_to_end(clave)
+                self.aciertos += 1
+                return self._pools[clave][0]
+            lock_calculo = self._locks_calculo.setdefault(clave, threading.Lock())
+
+        with lock_calculo:
+            with self._lock:
+                if clave in self._pools:
+                    self._pools.move_to_end(clave)
+                    self.aciertos += 1
+                    return self._pools[clave][0]
+                self.fallos += 1
+
+            df = construir()
+            tam = _tamaño(df)
+
+            with self._lock:
+                self._pools[clave] = (df, tam)
+                self.bytes += tam
+                self._locks_calculo.pop(clave, None)
+                # el más reciente se queda aunque él solo pase del límite
+                while self.bytes > self.max_bytes and len(self._pools) > 1:
+                    _, (_, tam_viejo) = self._pools.popitem(last=False)
+                    self.bytes -= tam_viejo
+                    self.expulsados += 1
+        return df
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "pools": len(self._pools),
+                "mb": round(self.bytes / 1024 / 1024, 1),
+                "max_mb": round(self.max_bytes / 1024 / 1024, 1),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsados": self.expulsados,
+                "tasa_aciertos": round(self.aciertos / total, 3) if total else None,
+            }
+
+
+# =========================
+# CACHÉ EN DISCO (Parquet, sobrevive a reinicios)
+# =========================
+def clave_disco(clave: tuple, huella: dict) -> str:
+    """Nombre del fichero del pool: selección + huella del ZIP de su temporada."""
+    temporada, categoria_sel, liga_sel, _, aproximado, metricas = clave
+    datos = [temporada, list(categoria_sel), list(liga_sel), huella, VERSION_POOL]
+    if aproximado:
+        datos.append("aproximado")
+    if metricas:
+        datos.append("metricas")
+    texto = json.dumps(datos, sort_keys=True)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+class CacheDiscoPools:
+    """
+    Pools en `<directorio>/<clave>.parquet`. Cada acierto actualiza el
+    mtime del fichero; al escribir, se borran los más antiguos hasta
+    quedar por debajo de `max_bytes`. Si la carpeta no se puede escribir,
+    la caché simplemente no guarda nada.
+    """
+
+    def __init__(self, directorio: str, max_bytes: int = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get(ENV_CACHE_DISCO_MB, CACHE_DISCO_MB)) * 1024 * 1024)
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.parquet")
+
+    def obtener(self, clave: str, construir):
+        """Pool de `clave` leído del disco o, si no está, `construir()` y guardado."""
+        ruta = self._ruta(clave)
+        try:
+            df = pd.read_parquet(ruta)
+            os.utime(ruta)
+        except (OSError, ValueError):
+            df = None
+
+        with self._lock:
+            if df is not None:
+                self.aciertos += 1
+                return df
+            self.fallos += 1
+
+        df = construir()
+        if not df.empty:
+            self._guardar(ruta, df)
+        return df
+
+    def _guardar(self, ruta: str, df) -> None:
+        tmp = f"{ruta}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            df.to_parquet(tmp, engine="pyarrow")
+            os.replace(tmp, ruta)
+        except (OSError, ValueError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._expulsar()
+
+    def _expulsar(self) -> None:
+        """Borra los Parquet menos usados (mtime más antiguo) hasta caber en el límite."""
+        with self._lock:
+            ficheros = []
+            for nombre in os.listdir(self.directorio):
+                if not nombre.endswith(".parquet"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.directorio, nombre))
+                except OSError:
+                    continue
+                ficheros.append((st.st_mtime, st.st_size, nombre))
+
+            total = sum(tam for _, tam, _ in ficheros)
+            # el más reciente se queda aunque él solo pase del límite
+            for _, tam, nombre in sorted(ficheros)[:-1]:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directorio, nombre))
+                    total -= tam
+                except OSError:
+                    pass
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {"aciertos": self.aciertos, "fallos": self.fallos}
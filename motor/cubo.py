@@ -0,0 +1,201 @@
+"""
+Cubo de percentiles precalculados por temporada.
+
+Para cada temporada se materializan, offline, los "Percentil Score ..."
+de los pools más habituales:
+
+  - la temporada completa (sin filtro de liga ni categoría),
+  - cada liga sola,
+  - cada categoría sola.
+
+Se guardan en `<zip>.pct.arrow` (Arrow IPC, junto al `.arrow` de datos):
+una fila por jugador y pool, con su posición en la partición (`fila`) y
+los percentiles en int8. Cada pool ocupa un tramo contiguo; en los
+metadatos va {pool: inicio, filas, columnas} y la huella del ZIP, así que
+servir un pool es un `slice` del fichero mapeado.
+
+Las selecciones de varias ligas / categorías (o liga + categoría) no
+están en el cubo: se calculan en vivo con `motor.percentiles`.
+
+La recarga en caliente (`GestorDataset.recargar`) reconstruye los cubos
+de las temporadas que cambian. Uso offline (ingesta + cubos de lo que
+haya cambiado):
+
+    python -m motor.cubo [carpeta_datos]
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from motor.esquema import compactar_dataframe
+from motor.ingesta import (
+    CLAVE_HUELLA,
+    _metadato_guardado,
+    abrir_columnar,
+    bloqueo_zip,
+    cargar_zip,
+    escribir_ipc,
+    ingestar_zip,
+    ruta_cubo,
+)
+from motor.percentiles import percentiles_por_rol
+from motor.registro import ROLES_PERCENTIL, columnas_base
+from motor.roles import con_roles, indice_roles
+
+
+# Tramos de cada pool dentro del fichero
+CLAVE_POOLS = b"osan_pools"
+
+# Si cambia la forma de calcular percentiles, se invalidan los cubos
+VERSION_CUBO = 1
+
+COLUMNA_FILA = "fila"
+
+
+def clave_pool(categoria_sel, liga_sel):
+    """Clave del pool en el cubo, o None si la selección no está precalculada."""
+    if not categoria_sel and not liga_sel:
+        return ""
+    if not categoria_sel and len(liga_sel) == 1:
+        return f"liga:{liga_sel[0]}"
+    if len(categoria_sel) == 1 and not liga_sel:
+        return f"categoria:{categoria_sel[0]}"
+    return None
+
+
+def _huella_cubo(huella: dict) -> dict:
+    return {"zip": huella, "cubo": VERSION_CUBO}
+
+
+def pools_temporada(df: pd.DataFrame):
+    """(clave, filas del pool) de todos los pools que se precalculan."""
+    yield "", df
+    for col, prefijo in (("Nombre_Liga", "liga"), ("Categoría_Liga", "categoria")):
+        if col not in df.columns:
+            continue
+        for valor in sorted({str(v) for v in df[col].dropna().unique()}):
+            yield f"{prefijo}:{valor}", df[df[col].isin([valor])]
+
+
+# =========================
+# CONSTRUCCIÓN (offline / en segundo plano)
+# =========================
+def construir_cubo(df: pd.DataFrame, indice, path: str, huella: dict) -> None:
+    """Calcula todos los pools de la partición `df` y escribe el cubo."""
+    partes = []
+    pools = {}
+    inicio = 0
+    for clave, df_scope in pools_temporada(df):
+        if df_scope.empty:
+            continue
+        pct = percentiles_por_rol(df_scope, ROLES_PERCENTIL, indice, step=5)
+        pools[clave] = {"inicio": inicio, "filas": len(df_scope), "columnas": list(pct.columns)}
+        partes.append(
+            pct.reset_index(drop=True).assign(
+                **{COLUMNA_FILA: df_scope.index.to_numpy(dtype=np.int64)}
+            )
+        )
+        inicio += len(df_scope)
+
+    if not partes:
+        return
+
+    cubo = pd.concat(partes, ignore_index=True)
+    cubo = cubo[[COLUMNA_FILA] + [c for c in cubo.columns if c != COLUMNA_FILA]]
+    cubo = cubo.astype({c: "Int8" for c in cubo.columns if c != COLUMNA_FILA})
+
+    table = pa.Table.from_pandas(cubo, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[CLAVE_HUELLA] = json.dumps(_huella_cubo(huella)).encode("utf-8")
+    metadata[CLAVE_POOLS] = json.dumps(pools).encode("utf-8")
+    escribir_ipc(table.replace_schema_metadata(metadata), path)
+
+
+def cubo_vigente(path: str, huella: dict) -> bool:
+    return os.path.exists(path) and _metadato_guardado(path, CLAVE_HUELLA) == _huella_cubo(huella)
+
+
+def precalcular_cubos(dataset, temporadas=None) -> list:
+    """
+    Construye el cubo de cada temporada de `dataset` que no lo tenga al
+    día. Devuelve las temporadas recalculadas.
+
+    Cada partición se lee aparte (misma carga que `Dataset.temporada`) y se
+    suelta al terminar: no se queda registrada en `dataset`. Con varios
+    procesos, el bloqueo del ZIP hace que cada cubo se construya una vez.
+    """
+    hechas = []
+    for temporada in dataset.temporadas if temporadas is None else temporadas:
+        zpath = dataset.zips[temporada]
+        path = ruta_cubo(zpath)
+        huella = dataset.huella(temporada)
+        if cubo_vigente(path, huella):
+            continue
+        # el `.arrow` antes del bloqueo del cubo (la ingesta toma el mismo)
+        ingestar_zip(zpath)
+        with bloqueo_zip(zpath):
+            # otro proceso puede haberlo construido mientras esperábamos
+            if cubo_vigente(path, huella):
+                continue
+            df = con_roles(compactar_dataframe(cargar_zip(zpath, columnas=columnas_base())))
+            try:
+                construir_cubo(df, indice_roles(df), path, huella)
+            except OSError:
+                # Carpeta de solo lectura: esos pools se calcularán en vivo
+                continue
+        hechas.append(temporada)
+    return hechas
+
+
+# =========================
+# CONSULTA
+# =========================
+class CuboPercentiles:
+    """Cubo de una temporada abierto con memory mapping."""
+
+    def __init__(self, table: pa.Table, pools: dict):
+        self.table = table
+        self.pools = pools
+
+    @classmethod
+    def abrir(cls, path: str, huella: dict):
+        """El cubo, o None si no existe o no corresponde a ese ZIP."""
+        if not cubo_vigente(path, huella):
+            return None
+        try:
+            return cls(abrir_columnar(path), _metadato_guardado(path, CLAVE_POOLS))
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+    def percentiles(self, categoria_sel, liga_sel, index: pd.Index):
+        """
+        Columnas "Percentil ..." (Int64) del pool, alineadas con `index`
+        (las filas de la selección), o None si ese pool no está en el cubo.
+        """
+        clave = clave_pool(categoria_sel, liga_sel)
+        pool = self.pools.get(clave) if clave is not None else None
+        if pool is None or pool["filas"] != len(index):
+            return None
+
+        tramo = self.table.slice(pool["inicio"], pool["filas"])
+        df = tramo.select([COLUMNA_FILA] + pool["columnas"]).to_pandas(
+            types_mapper={pa.int8(): pd.Int64Dtype()}.get
+        )
+        if not np.array_equal(df.pop(COLUMNA_FILA).to_numpy(), index.to_numpy()):
+            return None
+        df.index = index
+        return df
+
+
+if __name__ == "__main__":
+    from motor.dataset import Dataset
+    from motor.manifiesto import sincronizar_manifiesto
+
+    carpeta = sys.argv[1] if len(sys.argv) > 1 else "data"
+    dataset = Dataset(carpeta, 0, sincronizar_manifiesto(carpeta, ingestar=True))
+    for temporada in precalcular_cubos(dataset):
+        print(f"{temporada}: cubo de percentiles actualizado")
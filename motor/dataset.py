@@ -0,0 +1,271 @@
+"""
+Versiones del dataset y recarga en caliente cuando cambia `data/`.
+
+`Dataset` es una foto inmutable de `data/` (qué ZIP hay por temporada y
+su resumen) con su propia caché de particiones: cada sesión de Streamlit
+guarda la versión con la que trabaja y nunca ve cambios a mitad.
+
+`GestorDataset` tiene la versión vigente. Un hilo en segundo plano
+revisa `data/` cada pocos segundos (sondeo de tamaño / mtime de los ZIP,
+sin dependencias nuevas); si algo cambió:
+
+  1. ingiere las temporadas nuevas o cambiadas (`sincronizar_manifiesto`,
+     en serie y con un bloqueo por ZIP compartido entre procesos),
+  2. construye la nueva versión, reutilizando las particiones que no
+     cambiaron y precargando las que estaban en uso,
+  3. reconstruye los cubos de percentiles de las temporadas cambiadas
+     (`precalcular_cubos`, con el mismo bloqueo por ZIP: un worker lo
+     construye y los demás lo abren con `Dataset.cubo()`),
+  4. y solo entonces cambia la versión vigente (asignación bajo lock).
+
+Ninguna sesión espera a la recarga: las que ya estaban abiertas siguen
+con su versión hasta que piden otra (botón "Aplicar Percentiles").
+"""
+import os
+import threading
+import time
+import traceback
+
+from motor.aproximado import ResumenesCuantiles
+from motor.cubo import CuboPercentiles, precalcular_cubos
+from motor.esquema import compactar_dataframe
+from motor.ingesta import cargar_zip, ruta_cubo
+from motor.manifiesto import leer_manifiesto, sincronizar_manifiesto
+from motor.percentiles import ScoresPorLiga
+from motor.referencias import ReferenciasPercentil
+from motor.registro import ROLES_PERCENTIL, columnas_base, columnas_metricas
+from motor.roles import con_roles, indice_roles
+
+
+# Segundos entre revisiones de data/ (0 desactiva la recarga en caliente)
+ENV_INTERVALO_RECARGA = "OSAN_INTERVALO_RECARGA"
+INTERVALO_RECARGA = 30.0
+
+# OSAN_INFORME_MEMORIA=1 imprime la memoria por columna de cada partición
+# al cargarla (antes / después de compactar)
+ENV_INFORME_MEMORIA = "OSAN_INFORME_MEMORIA"
+
+
+def firma_carpeta(base_dir: str) -> tuple:
+    """Nombre / tamaño / mtime de los ZIP de la carpeta: cambia si llega o se toca uno."""
+    firma = []
+    for nombre in sorted(os.listdir(base_dir)):
+        if not nombre.lower().endswith(".zip"):
+            continue
+        st = os.stat(os.path.join(base_dir, nombre))
+        firma.append((nombre, st.st_size, st.st_mtime_ns))
+    return tuple(firma)
+
+
+# =========================
+# UNA VERSIÓN DEL DATASET
+# =========================
+class Dataset:
+    """
+    Foto de `data/` en un momento dado. Las particiones se cargan bajo
+    demanda y son de SOLO LECTURA (compartidas entre sesiones).
+    """
+
+    def __init__(self, base_dir: str, version: int, manifiesto: dict):
+        self.base_dir = base_dir
+        self.version = version
+        self.zips = {t: os.path.join(base_dir, e["zip"]) for t, e in manifiesto.items()}
+        self.indice = {t: e["resumen"] for t, e in manifiesto.items()}
+        self._huellas = {t: (e["zip"], e["huella"]) for t, e in manifiesto.items()}
+
+        self._particiones = {}
+        self._indices_roles = {}
+        self._cubos = {}
+        self._scores_por_liga = {}
+        self._resumenes = {}
+        self.referencias = ReferenciasPercentil(self)
+        self._lock = threading.Lock()
+        self._locks_carga = {}
+
+    @property
+    def temporadas(self) -> list:
+        return sorted(self.zips)
+
+    def temporada(self, temporada: str):
+        """Identidad + scores de una temporada (lo que usan percentiles y campograma)."""
+        return self._particion(temporada, None)
+
+    def metricas(self, temporada: str, grupo: str):
+        """Métricas "(ROL_TAG)" de un grupo; mismo índice que `temporada()`."""
+        return self._particion(temporada, grupo)
+
+    def _particion(self, temporada: str, grupo):
+        clave = (temporada, grupo)
+        with self._lock:
+            if clave in self._particiones:
+                return self._particiones[clave]
+            lock_carga = self._locks_carga.setdefault(clave, threading.Lock())
+
+        # Un lock por partición: otra temporada no espera a esta carga
+        with lock_carga:
+            if clave not in self._particiones:
+                columnas = columnas_base() if grupo is None else columnas_metricas(grupo)
+                informe = os.environ.get(ENV_INFORME_MEMORIA, "").strip() not in ("", "0")
+                if informe:
+                    print(f"[OSAN] memoria de la partición {temporada} / {grupo or 'scores'}")
+                # 👉 si data/ ya tiene otro snapshot de la temporada, esta
+                #    versión no vuelve a crear el `.arrow` que se borró
+                df = compactar_dataframe(
+                    cargar_zip(self.zips[temporada], columnas=columnas, escribir=not self.superada(temporada)),
+                    informe=informe,
+                )
+                if grupo is None:
+                    # Roles como bits en una sola columna uint16 (rol_bits), calculados una vez
+                    df = con_roles(df)
+                with self._lock:
+                    self._particiones[clave] = df
+        return self._particiones[clave]
+
+    def superada(self, temporada: str) -> bool:
+        """True si el manifiesto de data/ ya apunta a otro snapshot de la temporada."""
+        entrada = leer_manifiesto(self.base_dir).get(temporada)
+        return entrada is not None and (entrada.get("zip"), entrada.get("huella")) != self._huellas[temporada]
+
+    def roles(self, temporada: str) -> dict:
+        """Índice rol → posiciones de fila de la partición (una vez por versión)."""
+        with self._lock:
+            if temporada in self._indices_roles:
+                return self._indices_roles[temporada]
+        indice = indice_roles(self.temporada(temporada))
+        with self._lock:
+            return self._indices_roles.setdefault(temporada, indice)
+
+    def huella(self, temporada: str) -> dict:
+        return self._huellas[temporada][1]
+
+    def cubo(self, temporada: str):
+        """Cubo de percentiles precalculados de la temporada, o None si no lo hay."""
+        with self._lock:
+            if temporada in self._cubos:
+                return self._cubos[temporada]
+        cubo = CuboPercentiles.abrir(ruta_cubo(self.zips[temporada]), self.huella(temporada))
+        if cubo is None:
+            return None
+        with self._lock:
+            return self._cubos.setdefault(temporada, cubo)
+
+    def scores_por_liga(self, temporada: str) -> ScoresPorLiga:
+        """Scores ordenados por liga y rol (pools de varias ligas), una vez por versión."""
+        with self._lock:
+            if temporada in self._scores_por_liga:
+                return self._scores_por_liga[temporada]
+        ordenados = ScoresPorLiga(self.temporada(temporada), ROLES_PERCENTIL, self.roles(temporada))
+        with self._lock:
+            return self._scores_por_liga.setdefault(temporada, ordenados)
+
+    def resumenes(self, temporada: str) -> ResumenesCuantiles:
+        """Resúmenes de cuantiles por liga (percentiles aproximados), una vez por versión."""
+        with self._lock:
+            if temporada in self._resumenes:
+                return self._resumenes[temporada]
+        resumenes = ResumenesCuantiles(self.temporada(temporada), ROLES_PERCENTIL, self.roles(temporada))
+        with self._lock:
+            return self._resumenes.setdefault(temporada, resumenes)
+
+    def claves_cargadas(self) -> list:
+        with self._lock:
+            return list(self._particiones)
+
+    def heredar(self, anterior: "Dataset") -> None:
+        """Reutiliza las particiones de `anterior` cuyo ZIP no ha cambiado."""
+        with anterior._lock:
+            previas = dict(anterior._particiones)
+        with self._lock:
+            for (temporada, grupo), df in previas.items():
+                if self._huellas.get(temporada) == anterior._huellas.get(temporada):
+                    self._particiones.setdefault((temporada, grupo), df)
+
+
+# =========================
+# VERSIÓN VIGENTE + VIGILANCIA DE data/
+# =========================
+class GestorDataset:
+    """Versión vigente del dataset y recarga en segundo plano."""
+
+    def __init__(self, base_dir: str, intervalo: float = None):
+        if intervalo is None:
+            intervalo = float(os.environ.get(ENV_INTERVALO_RECARGA, INTERVALO_RECARGA))
+        self.base_dir = base_dir
+        self.intervalo = intervalo
+
+        self._lock = threading.Lock()
+        self._hilo = None
+
+        # Arranque sin ingesta: cada temporada se ingiere al pedirla
+        self._firma = firma_carpeta(base_dir)
+        self._actual = Dataset(base_dir, 1, sincronizar_manifiesto(base_dir))
+
+    @property
+    def actual(self) -> Dataset:
+        with self._lock:
+            return self._actual
+
+    def para_temporadas(self, dataset: Dataset, temporadas) -> Dataset:
+        """
+        `dataset` si puede seguir cargando `temporadas`; si alguna cambió
+        de snapshot (su ZIP / `.arrow` anteriores ya no están en data/), la
+        versión vigente, que comparte las particiones que no cambiaron.
+        """
+        actual = self.actual
+        for temporada in temporadas:
+            if (
+                temporada in dataset.zips
+                and temporada in actual.zips
+                and dataset._huellas[temporada] != actual._huellas[temporada]
+            ):
+                return actual
+        return dataset
+
+    def recargar(self, forzar: bool = False) -> bool:
+        """Reconstruye y publica una versión nueva si `data/` cambió. True si la hubo."""
+        firma = firma_carpeta(self.base_dir)
+        if firma == self._firma and not forzar:
+            return False
+
+        anterior = self.actual
+        # 👉 en serie (sin pool de procesos: esto corre en un hilo del
+        #    servidor) y con bloqueo por ZIP: entre todos los workers, cada
+        #    ZIP nuevo se parsea una sola vez
+        nuevo = Dataset(
+            self.base_dir,
+            anterior.version + 1,
+            sincronizar_manifiesto(self.base_dir, ingestar=True, paralelo=False),
+        )
+        nuevo.heredar(anterior)
+
+        # Lo que estaba en uso se deja cargado antes de publicar la versión
+        for temporada, grupo in anterior.claves_cargadas():
+            if temporada in nuevo.zips:
+                nuevo._particion(temporada, grupo)
+
+        # Cubos solo de lo que cambió (los de su snapshot anterior ya se borraron)
+        cambiadas = [t for t in nuevo.temporadas if nuevo._huellas[t] != anterior._huellas.get(t)]
+        if cambiadas:
+            precalcular_cubos(nuevo, cambiadas)
+
+        with self._lock:
+            self._actual = nuevo
+            self._firma = firma
+        return True
+
+    def iniciar_vigilancia(self) -> None:
+        """Arranca (una vez) el hilo que revisa `data/` cada `intervalo` segundos."""
+        if self.intervalo <= 0 or self._hilo is not None:
+            return
+        self._hilo = threading.Thread(target=self._vigilar, name="osan-recarga", daemon=True)
+        self._hilo.start()
+
+    def _vigilar(self) -> None:
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                if self.recargar():
+                    print(f"[OSAN] dataset recargado → versión {self.actual.version}")
+            except Exception:
+                # ZIP a medio copiar, etc.: se reintenta en la siguiente vuelta
+                traceback.print_exc()
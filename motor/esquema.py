@@ -0,0 +1,152 @@
+"""
+Esquema declarado del dataset de temporadas.
+
+- Categóricas: columnas de texto muy repetidas (temporada, liga, equipo...).
+- Texto: nombre del jugador y fin de contrato.
+- float32: todas las "Score ..." y todas las métricas "(..._...)".
+- Int32 (nullable): minutos y edad.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+COLUMNAS_CATEGORICAS = [
+    "Temporada",
+    "Nombre_Liga",
+    "Categoría_Liga",
+    "Pos",
+    "Equipo",
+    "Nacionalidad",
+]
+
+# Texto libre (no categórico): siempre str, con los vacíos como NaN
+COLUMNAS_TEXTO = [
+    "Jugador",
+    "Fin de contrato",
+]
+
+COLUMNAS_ENTERAS = [
+    "Minutos jugados",
+    "Edad",
+]
+
+# Métricas por rol: terminan en "(GK_PORTERO)", "(MC_B2B)", "(DEL_9)"...
+PATRON_METRICA = re.compile(r"\([^()]*_[^()]*\)\s*$")
+
+
+def es_columna_score(col: str) -> bool:
+    return str(col).startswith("Score ")
+
+
+def es_columna_metrica(col: str) -> bool:
+    return bool(PATRON_METRICA.search(str(col)))
+
+
+def es_columna_float32(col: str) -> bool:
+    return es_columna_score(col) or es_columna_metrica(col)
+
+
+def tipos_declarados(columnas) -> dict:
+    """
+    dtype para `pd.read_csv` de las columnas presentes en la cabecera.
+    Las enteras se leen como float64 y se pasan a Int32 después
+    (así un "1234.0" en el CSV no rompe el parseo).
+    """
+    tipos = {}
+    for col in columnas:
+        if col in COLUMNAS_CATEGORICAS:
+            tipos[col] = "category"
+        elif col in COLUMNAS_ENTERAS:
+            tipos[col] = "float64"
+        elif es_columna_float32(col):
+            tipos[col] = "float32"
+    return tipos
+
+
+def _a_texto(serie: pd.Series) -> pd.Series:
+    """
+    Valores como str, conservando los nulos (NaN). Los números enteros
+    quedan sin ".0" y las fechas en ISO, así que da igual qué motor de
+    lectura los haya inferido ("2025", 2025 y 2025.0 → "2025").
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype(serie.cat.categories.dtype)
+    if pd.api.types.is_float_dtype(serie) and (serie.dropna() % 1 == 0).all():
+        serie = serie.astype("Int64")
+    return serie.astype(str).where(serie.notna(), np.nan)
+
+
+def aplicar_esquema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Lleva un DataFrame (leído con o sin dtypes) al esquema declarado.
+    Los valores no numéricos de columnas numéricas pasan a NaN; las
+    categóricas y las de texto quedan como str sea cual sea el motor.
+    """
+    for col in df.columns:
+        if col in COLUMNAS_CATEGORICAS:
+            serie = df[col]
+            categorias = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else None
+            if categorias is None or not all(isinstance(c, str) for c in categorias):
+                df[col] = _a_texto(serie).astype("category")
+        elif col in COLUMNAS_TEXTO:
+            df[col] = _a_texto(df[col])
+        elif col in COLUMNAS_ENTERAS:
+            if df[col].dtype != "Int32":
+                serie = pd.to_numeric(df[col], errors="coerce")
+                df[col] = serie.round().astype("Int32")
+        elif es_columna_float32(col):
+            if df[col].dtype != np.float32:
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
+    return df
+
+
+# =========================
+# COMPACTACIÓN EN MEMORIA + INFORME
+# =========================
+# Una columna de texto pasa a categórica si tiene, como mucho, esta
+# proporción de valores distintos (Jugador, p.ej., se queda como texto)
+MAX_RATIO_CATEGORICA = 0.5
+
+
+def compactar_dataframe(df: pd.DataFrame, informe: bool = False) -> pd.DataFrame:
+    """
+    Reduce la huella en memoria del DataFrame maestro:
+      - texto repetido (object) → category
+      - Score / métricas "(..._...)" en float64 → float32
+    Con `informe=True` imprime el uso de memoria por columna antes/después.
+    """
+    antes = df.memory_usage(deep=True, index=False) if informe else None
+    dtypes_antes = df.dtypes.astype(str) if informe else None
+
+    n = max(len(df), 1)
+    for col in df.columns:
+        serie = df[col]
+        if serie.dtype == object:
+            if serie.nunique(dropna=True) / n <= MAX_RATIO_CATEGORICA:
+                df[col] = serie.astype("category")
+        elif serie.dtype == np.float64 and es_columna_float32(col):
+            df[col] = serie.astype(np.float32)
+
+    if informe:
+        print(informe_memoria(antes, dtypes_antes, df).to_string())
+
+    return df
+
+
+def informe_memoria(antes: pd.Series, dtypes_antes: pd.Series, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tabla por columna (KB y dtype antes/después), ordenada por lo que
+    ocupaba antes, con una fila TOTAL al final.
+    """
+    despues = df.memory_usage(deep=True, index=False)
+    tabla = pd.DataFrame({
+        "dtype_antes": dtypes_antes,
+        "kb_antes": (antes / 1024).round(1),
+        "dtype_despues": df.dtypes.astype(str),
+        "kb_despues": (despues / 1024).round(1),
+    }).sort_values("kb_antes", ascending=False)
+
+    tabla.loc["TOTAL"] = ["", tabla["kb_antes"].sum(), "", tabla["kb_despues"].sum()]
+    return tabla
@@ -0,0 +1,422 @@
+"""
+Ingesta de los ZIP de temporada a un almacén columnar.
+
+Cada ZIP de temporada (`<mes>_<año>_temporada_<YYYY>.zip`, ver
+`motor.manifiesto`) se convierte UNA sola vez en un fichero Arrow IPC
+(Feather v2, sin comprimir) que se guarda junto al ZIP (mismo nombre,
+extensión `.arrow`). En los metadatos del esquema se
+guarda la huella del ZIP (tamaño, mtime y CRC de sus miembros): si la
+huella coincide se abre el `.arrow` y no se vuelve a parsear el CSV.
+
+El `.arrow` se abre con memory mapping: las columnas numéricas se
+convierten a pandas sin copia, apuntando al fichero mapeado. Con varios
+procesos de Streamlit en la misma máquina, la caché de páginas del SO
+guarda una sola copia física del dataset para todos.
+
+El CSV se parsea con el motor C de pandas y un esquema declarado
+(`motor.esquema`): el delimitador se detecta UNA vez con las primeras KB
+del fichero. El modo "python" (sep=None, motor python) queda como
+respaldo y para comparar resultados.
+
+Junto a la huella se guarda un resumen de la partición (temporadas,
+ligas, categorías, nº de filas): el índice de temporadas para el sidebar
+sale de ahí sin cargar ningún dato.
+
+Los ZIP que sí hay que parsear se reparten en un pool de procesos (un
+worker por temporada) que solo escribe los `.arrow`; cada partición se
+abre después, bajo demanda, con memory mapping (`cargar_zip`).
+"""
+import csv
+import io
+import json
+import os
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+from motor.esquema import aplicar_esquema, tipos_declarados
+
+
+# Clave bajo la que se guarda la huella del ZIP en los metadatos del esquema
+CLAVE_HUELLA = b"osan_huella_zip"
+# ... y el resumen de la partición (temporadas / ligas / categorías)
+CLAVE_METADATOS = b"osan_metadatos"
+
+# OSAN_CARGA_SERIE=1 fuerza la carga en serie (contenedores con 1 CPU,
+# sin /dev/shm, etc.)
+ENV_CARGA_SERIE = "OSAN_CARGA_SERIE"
+
+# Modo de lectura del CSV: "c" (por defecto), "pyarrow" o "python" (legacy)
+ENV_MODO_LECTURA = "OSAN_MODO_LECTURA"
+MODOS_LECTURA = ("c", "pyarrow", "python")
+
+# Si cambia el esquema declarado, se invalida la caché columnar existente
+VERSION_ESQUEMA = 4
+
+# KB iniciales del CSV que se usan para detectar el delimitador
+BYTES_MUESTRA = 64 * 1024
+
+
+# =========================
+# HUELLA DEL ZIP (tamaño / mtime / CRC)
+# =========================
+def huella_zip(zpath: str) -> dict:
+    """
+    Huella barata del ZIP: no descomprime nada, solo lee el directorio
+    central (que ya trae el CRC32 de cada miembro).
+    """
+    st = os.stat(zpath)
+    crc = 0
+    with zipfile.ZipFile(zpath, "r") as z:
+        for info in z.infolist():
+            crc = zlib.crc32(
+                f"{info.filename}:{info.CRC:08x}:{info.file_size}".encode("utf-8"),
+                crc,
+            )
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "crc": crc,
+        "esquema": VERSION_ESQUEMA,
+    }
+
+
+def ruta_columnar(zpath: str) -> str:
+    """Ruta del `.arrow` (Arrow IPC) que acompaña al ZIP."""
+    return os.path.splitext(zpath)[0] + ".arrow"
+
+
+def ruta_cubo(zpath: str) -> str:
+    """Ruta del cubo de percentiles precalculados de la temporada (`motor.cubo`)."""
+    return os.path.splitext(zpath)[0] + ".pct.arrow"
+
+
+def ruta_bloqueo(zpath: str) -> str:
+    """Fichero de bloqueo de la temporada (ingesta y cubo, un proceso a la vez)."""
+    return os.path.splitext(zpath)[0] + ".lock"
+
+
+@contextmanager
+def bloqueo_zip(zpath: str):
+    """
+    Bloqueo exclusivo entre procesos (flock sobre `<zip>.lock`) mientras
+    se escriben los ficheros derivados del ZIP: con varios workers de
+    Streamlit, uno parsea / construye y el resto espera y se encuentra
+    el fichero hecho. El SO lo suelta si el proceso muere. Sin `fcntl` o
+    en una carpeta de solo lectura, no bloquea.
+    """
+    try:
+        fd = os.open(ruta_bloqueo(zpath), os.O_RDWR | os.O_CREAT, 0o644) if fcntl else None
+    except OSError:
+        fd = None
+    try:
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+# =========================
+# LECTURA DEL CSV DENTRO DEL ZIP
+# =========================
+def detectar_delimitador(muestra: str) -> str:
+    """
+    Detecta el separador con `csv.Sniffer` sobre las primeras líneas
+    completas de la muestra. Si no lo consigue, asume coma.
+    """
+    if "\n" in muestra:
+        muestra = muestra[: muestra.rfind("\n")]
+    try:
+        return csv.Sniffer().sniff(muestra, delimiters=";,\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def _modo_lectura(modo=None) -> str:
+    modo = (modo or os.environ.get(ENV_MODO_LECTURA) or "c").strip().lower()
+    if modo not in MODOS_LECTURA:
+        raise ValueError(f"Modo de lectura desconocido: {modo} (válidos: {MODOS_LECTURA})")
+    return modo
+
+
+def leer_csv_zip(zpath: str, modo=None) -> pd.DataFrame:
+    """
+    Lee el primer CSV que haya dentro del zip (sin extraer a disco).
+
+    - modo "c" / "pyarrow": detecta el delimitador con las primeras KB y
+      parsea con ese motor y el esquema declarado.
+    - modo "python": el parseo original (sep=None, motor python).
+    Si el parseo rápido falla por algún valor raro, se repite en modo python.
+    """
+    modo = _modo_lectura(modo)
+
+    with zipfile.ZipFile(zpath, "r") as z:
+        csv_names = [n for n in z.namelist() if n.lower().endswith(".csv")]
+        if not csv_names:
+            raise ValueError(f"El zip {os.path.basename(zpath)} no contiene ningún CSV")
+        csv_inside = csv_names[0]
+
+        if modo != "python":
+            with z.open(csv_inside) as f:
+                muestra = f.read(BYTES_MUESTRA).decode("utf-8-sig", errors="ignore")
+            sep = detectar_delimitador(muestra)
+            cabecera = next(csv.reader(io.StringIO(muestra), delimiter=sep), [])
+
+            try:
+                with z.open(csv_inside) as f:
+                    df = pd.read_csv(
+                        f,
+                        sep=sep,
+                        engine=modo,
+                        encoding="utf-8-sig",
+                        dtype=tipos_declarados(cabecera),
+                    )
+                return aplicar_esquema(df)
+            except (ValueError, pd.errors.ParserError):
+                pass
+
+        with z.open(csv_inside) as f:
+            df = pd.read_csv(
+                f,
+                sep=None,
+                engine="python",
+                encoding="utf-8-sig"
+            )
+        return aplicar_esquema(df)
+
+
+def normalizar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja el DataFrame listo para Arrow: columnas object con tipos
+    mezclados (str + números) → string, conservando los NaN. Las
+    declaradas de texto ("Fin de contrato"...) ya vienen como str de
+    `aplicar_esquema`.
+    """
+    for col in df.columns[df.dtypes == object]:
+        serie = df[col]
+        no_nulos = serie.dropna()
+        if no_nulos.map(type).eq(str).all():
+            continue
+        df[col] = serie.where(serie.isna(), serie.astype(str))
+
+    return df
+
+
+# =========================
+# INGESTA: ZIP → ARROW IPC (solo si cambió la huella)
+# =========================
+def abrir_columnar(path_columnar: str) -> pa.Table:
+    """
+    Abre el `.arrow` con memory mapping. La tabla no copia nada: sus
+    buffers apuntan al fichero mapeado (y lo mantienen abierto).
+    """
+    return pa.ipc.open_file(pa.memory_map(path_columnar, "r")).read_all()
+
+
+def _metadato_guardado(path_columnar: str, clave: bytes):
+    try:
+        # solo se lee el footer con el esquema, no los datos
+        schema = pa.ipc.open_file(pa.memory_map(path_columnar, "r")).schema
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw = (schema.metadata or {}).get(clave)
+    return json.loads(raw) if raw else None
+
+
+def _huella_guardada(path_columnar: str):
+    return _metadato_guardado(path_columnar, CLAVE_HUELLA)
+
+
+def resumen_particion(df: pd.DataFrame) -> dict:
+    """Temporadas, ligas y categorías presentes (como texto) + nº de filas."""
+    def valores(col):
+        if col not in df.columns:
+            return []
+        return sorted({str(v) for v in df[col].dropna().unique()})
+
+    return {
+        "temporadas": valores("Temporada"),
+        "ligas": valores("Nombre_Liga"),
+        "categorias": valores("Categoría_Liga"),
+        "filas": len(df),
+    }
+
+
+def escribir_columnar(df: pd.DataFrame, path_columnar: str, huella: dict) -> None:
+    """
+    Escribe el Arrow IPC (sin comprimir) de forma atómica (tmp + rename)
+    con la huella del ZIP y el resumen de la partición en los metadatos.
+
+    Las columnas float se guardan con NaN como valor (no como null): así
+    no llevan bitmap de nulos y pandas las puede usar sin copiarlas.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, name in enumerate(table.column_names):
+        if pa.types.is_floating(table.schema.field(i).type):
+            valores = np.asarray(df[name], dtype=table.schema.field(i).type.to_pandas_dtype())
+            table = table.set_column(i, table.schema.field(i), pa.array(valores))
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[CLAVE_HUELLA] = json.dumps(huella).encode("utf-8")
+    metadata[CLAVE_METADATOS] = json.dumps(resumen_particion(df)).encode("utf-8")
+    escribir_ipc(table.replace_schema_metadata(metadata), path_columnar)
+
+
+def escribir_ipc(table: pa.Table, path: str) -> None:
+    """Arrow IPC sin comprimir, escrito de forma atómica (tmp + rename)."""
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def columnar_vigente(zpath: str) -> bool:
+    """True si el `.arrow` del ZIP existe y su huella coincide."""
+    path_columnar = ruta_columnar(zpath)
+    return (
+        os.path.exists(path_columnar)
+        and _huella_guardada(path_columnar) == huella_zip(zpath)
+    )
+
+
+def metadatos_zip(zpath: str):
+    """
+    Resumen de la partición guardado en el `.arrow`, o None si el fichero
+    no existe o no está al día con el ZIP.
+    """
+    if not columnar_vigente(zpath):
+        return None
+    return _metadato_guardado(ruta_columnar(zpath), CLAVE_METADATOS)
+
+
+def _proyeccion(disponibles, columnas):
+    """Columnas pedidas que existen, en el orden del fichero (None = todas)."""
+    if columnas is None:
+        return None
+    pedidas = set(columnas)
+    return [c for c in disponibles if c in pedidas]
+
+
+def leer_columnar(path_columnar: str, columnas=None) -> pd.DataFrame:
+    """
+    DataFrame sobre el `.arrow` mapeado en memoria. `split_blocks=True`
+    deja cada columna numérica como vista (de solo lectura) del fichero;
+    categóricas, enteros con nulos y textos sí se materializan.
+    """
+    table = abrir_columnar(path_columnar)
+    cols = _proyeccion(table.column_names, columnas)
+    if cols is not None:
+        table = table.select(cols)
+    return table.to_pandas(split_blocks=True)
+
+
+def ingestar_zip(zpath: str):
+    """
+    Garantiza que el `.arrow` del ZIP está al día (parsea el CSV solo si
+    la huella cambió). Devuelve el DataFrame recién parseado, o None si
+    no hizo falta parsear.
+    """
+    huella = huella_zip(zpath)
+    path_columnar = ruta_columnar(zpath)
+    if os.path.exists(path_columnar) and _huella_guardada(path_columnar) == huella:
+        return None
+
+    with bloqueo_zip(zpath):
+        # otro proceso puede haberlo escrito mientras esperábamos
+        if os.path.exists(path_columnar) and _huella_guardada(path_columnar) == huella:
+            return None
+        df = normalizar_tipos(leer_csv_zip(zpath))
+        try:
+            escribir_columnar(df, path_columnar, huella)
+        except OSError:
+            # Carpeta de solo lectura: seguimos sin caché columnar
+            pass
+    return df
+
+
+def _ingestar_en_worker(zpath: str) -> bool:
+    """Worker del pool: escribe el `.arrow` y no devuelve el DataFrame."""
+    ingestar_zip(zpath)
+    return columnar_vigente(zpath)
+
+
+def cargar_zip(zpath: str, columnas=None, escribir: bool = True) -> pd.DataFrame:
+    """
+    Devuelve el DataFrame de un ZIP de temporada.
+
+    - Si el `.arrow` está al día → lectura mapeada en memoria.
+    - Si no → se parsea el CSV, se guarda el `.arrow` y se lee de él.
+    Con `columnas` solo se leen (o devuelven) esas columnas. Con
+    `escribir=False` no se crea el `.arrow` (snapshot ya sustituido): el
+    CSV se parsea en memoria.
+    """
+    if not escribir and not columnar_vigente(zpath):
+        df = normalizar_tipos(leer_csv_zip(zpath))
+    else:
+        df = ingestar_zip(zpath)
+    if columnar_vigente(zpath):
+        return leer_columnar(ruta_columnar(zpath), columnas)
+
+    # Sin caché columnar (no se pudo escribir): DataFrame en memoria
+    if columnas is not None:
+        df = df[_proyeccion(df.columns, columnas)]
+    return df
+
+
+# =========================
+# CARGA DE VARIAS TEMPORADAS (pool de procesos + fallback en serie)
+# =========================
+def carga_paralela_disponible() -> bool:
+    """
+    False si se ha forzado la carga en serie o si el proceso solo
+    puede usar una CPU.
+    """
+    if os.environ.get(ENV_CARGA_SERIE, "").strip() not in ("", "0"):
+        return False
+    try:
+        n_cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        n_cpus = os.cpu_count() or 1
+    return n_cpus > 1
+
+
+def ingestar_zips(zpaths, paralelo=None) -> None:
+    """
+    Deja al día el `.arrow` de cada ZIP. Los que haya que parsear se
+    reparten en un pool de procesos, un worker por ZIP, salvo que
+    `paralelo=False` o no haya CPUs de sobra (entonces, en serie).
+    Desde un hilo de un servidor multihilo, `paralelo=False`: hacer fork
+    ahí puede dejar al hijo bloqueado en un lock de otro hilo.
+    """
+    if paralelo is None:
+        paralelo = carga_paralela_disponible()
+
+    pendientes = [z for z in zpaths if not columnar_vigente(z)]
+
+    if paralelo and len(pendientes) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=len(pendientes)) as pool:
+                list(pool.map(_ingestar_en_worker, pendientes))
+            return
+        except (OSError, BrokenProcessPool):
+            # Sin soporte para procesos (p.ej. /dev/shm de solo lectura):
+            # seguimos en serie con lo que falte
+            pass
+
+    for zpath in pendientes:
+        ingestar_zip(zpath)
@@ -0,0 +1,152 @@
+"""
+Descubrimiento de los ZIP de temporada y manifiesto de ingesta.
+
+En `data/` se buscan ficheros `<mes>_<año>_temporada_<YYYY>.zip`
+(p.ej. `noviembre_2025_temporada_2025.zip`) y, para cada temporada, se
+queda el snapshot más reciente (año + mes del nombre).
+
+`data/manifest.json` guarda, por temporada, qué ZIP está activo, su
+huella y el resumen de la partición. Solo se vuelve a ingerir una
+temporada si cambia su ZIP o su huella; el resto reutiliza su `.arrow`.
+
+Uso offline (ingesta de lo que haya cambiado, en paralelo):
+
+    python -m motor.manifiesto [carpeta_datos]
+"""
+import json
+import os
+import re
+import sys
+
+from motor.ingesta import (
+    huella_zip,
+    ingestar_zips,
+    metadatos_zip,
+    ruta_bloqueo,
+    ruta_columnar,
+    ruta_cubo,
+)
+
+
+NOMBRE_MANIFIESTO = "manifest.json"
+
+PATRON_SNAPSHOT = re.compile(
+    r"^(?P<mes>[a-z]+)_(?P<anio>\d{4})_temporada_(?P<temporada>\d{4})\.zip$",
+    re.IGNORECASE,
+)
+
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
+    "julio": 7, "agosto": 8, "septiembre": 9, "setiembre": 9,
+    "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+
+
+# =========================
+# DESCUBRIMIENTO DE SNAPSHOTS
+# =========================
+def descubrir_zips(base_dir: str) -> dict:
+    """
+    {temporada: ruta del ZIP más reciente}, ordenado por temporada.
+    Los ficheros con un mes que no se reconoce se ignoran.
+    """
+    mejores = {}
+    for nombre in os.listdir(base_dir):
+        m = PATRON_SNAPSHOT.match(nombre)
+        if not m or m.group("mes").lower() not in MESES:
+            continue
+        clave = (int(m.group("anio")), MESES[m.group("mes").lower()])
+        temporada = m.group("temporada")
+        if temporada not in mejores or clave > mejores[temporada][0]:
+            mejores[temporada] = (clave, os.path.join(base_dir, nombre))
+
+    return {t: mejores[t][1] for t in sorted(mejores)}
+
+
+# =========================
+# MANIFIESTO
+# =========================
+def leer_manifiesto(base_dir: str) -> dict:
+    try:
+        with open(os.path.join(base_dir, NOMBRE_MANIFIESTO), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def escribir_manifiesto(base_dir: str, manifiesto: dict) -> None:
+    """Escritura atómica (tmp + rename); en solo lectura no hace nada."""
+    path = os.path.join(base_dir, NOMBRE_MANIFIESTO)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _borrar_columnar_anterior(base_dir: str, entrada: dict, zpath_nuevo: str) -> None:
+    """
+    Si la temporada cambió de snapshot, sus `.arrow` (datos y cubo) y su
+    `.lock` sobran: las sesiones con una versión anterior pasan a la
+    vigente al pedir esa temporada (`GestorDataset.para_temporadas`) y
+    una versión anterior nunca los vuelve a crear (`Dataset.superada`).
+    """
+    zip_anterior = entrada.get("zip")
+    if not zip_anterior or zip_anterior == os.path.basename(zpath_nuevo):
+        return
+    for ruta in (ruta_columnar, ruta_cubo, ruta_bloqueo):
+        try:
+            os.remove(ruta(os.path.join(base_dir, zip_anterior)))
+        except OSError:
+            pass
+
+
+def sincronizar_manifiesto(base_dir: str, ingestar: bool = False, paralelo=None) -> dict:
+    """
+    Pone el manifiesto al día con los ZIP de `base_dir`.
+
+    - Temporadas cuyo ZIP y huella no cambian → se reutiliza la entrada.
+    - Temporadas nuevas o cambiadas → con `ingestar=True` se ingieren
+      (en paralelo); si no, quedan con resumen None y se ingieren al
+      cargarlas por primera vez.
+    """
+    zips = descubrir_zips(base_dir)
+    anterior = leer_manifiesto(base_dir)
+
+    huellas = {t: huella_zip(z) for t, z in zips.items()}
+    cambiadas = [
+        t for t, z in zips.items()
+        if anterior.get(t, {}).get("zip") != os.path.basename(z)
+        or anterior.get(t, {}).get("huella") != huellas[t]
+        or anterior.get(t, {}).get("resumen") is None
+        or not os.path.exists(ruta_columnar(z))
+    ]
+
+    if ingestar and cambiadas:
+        ingestar_zips([zips[t] for t in cambiadas], paralelo=paralelo)
+
+    manifiesto = {}
+    for t, z in zips.items():
+        if t in cambiadas:
+            _borrar_columnar_anterior(base_dir, anterior.get(t, {}), z)
+            resumen = metadatos_zip(z)
+        else:
+            resumen = anterior[t]["resumen"]
+        manifiesto[t] = {
+            "zip": os.path.basename(z),
+            "huella": huellas[t],
+            "resumen": resumen,
+        }
+
+    if manifiesto != anterior:
+        escribir_manifiesto(base_dir, manifiesto)
+    return manifiesto
+
+
+if __name__ == "__main__":
+    carpeta = sys.argv[1] if len(sys.argv) > 1 else "data"
+    for temporada, entrada in sincronizar_manifiesto(carpeta, ingestar=True).items():
+        resumen = entrada["resumen"] or {}
+        print(f"{temporada}: {entrada['zip']} ({resumen.get('filas', '?')} filas)")
@@ -0,0 +1,365 @@
+"""
+Motor de percentiles por rol sobre arrays de numpy.
+
+Semántica de los percentiles de la página:
+
+  - rank medio dentro del subset (empates → media de sus posiciones),
+    dividido por el nº de valores no nulos, × 100 y redondeado
+    (`round` de numpy = el de pandas, mitades al par),
+  - discretizado en saltos de `step` (0, 5, ..., 100),
+  - los NaN no cuentan para el rank y se quedan sin percentil,
+  - una columna sin ningún valor en el subset no genera percentil.
+
+Cada rol se resuelve con UN argsort sobre el bloque 2-D float32 por
+columnas (filas del rol × scores del rol, `bloque_float32`); los grupos
+de empates se sacan con acumulados, sin bucles de Python por columna ni
+DataFrames intermedios. El resultado de todos los roles se escribe en un
+único DataFrame de columnas Int64.
+
+Para pools de varias ligas, `ScoresPorLiga` guarda los scores ordenados
+de cada liga; el pool concatena esos tramos ya ordenados y los mezcla con
+un argsort estable (timsort), más barato que ordenar la unión desde cero.
+`PercentilesPorMinutos` precalcula un pool para todos los umbrales de
+minutos mínimos de la rejilla de 90'.
+"""
+import numpy as np
+import pandas as pd
+
+from motor.registro import es_metrica_negativa
+from motor.roles import posiciones_rol
+
+
+def rangos_promedio(valores: np.ndarray) -> np.ndarray:
+    """
+    Rank medio (1..m) de cada columna de `valores` (n × k), como
+    `Series.rank(method="average")`. NaN → NaN.
+    """
+    n = valores.shape[0]
+    orden = np.argsort(valores, axis=0, kind="stable")  # NaN al final
+    ordenados = np.take_along_axis(valores, orden, axis=0)
+
+    posiciones = np.arange(1, n + 1, dtype=np.float64)[:, None]
+
+    # inicio de cada grupo de empates (NaN != NaN: nunca empatan)
+    inicio = np.ones(ordenados.shape, dtype=bool)
+    inicio[1:] = ordenados[1:] != ordenados[:-1]
+    fin = np.ones(ordenados.shape, dtype=bool)
+    fin[:-1] = inicio[1:]
+
+    primero = np.maximum.accumulate(np.where(inicio, posiciones, 0.0), axis=0)
+    ultimo = np.minimum.accumulate(np.where(fin, posiciones, n + 1.0)[::-1], axis=0)[::-1]
+
+    rangos = np.empty(ordenados.shape, dtype=np.float64)
+    np.put_along_axis(rangos, orden, (primero + ultimo) / 2, axis=0)
+    rangos[np.isnan(valores)] = np.nan
+    return rangos
+
+
+def discretizar(rangos: np.ndarray, validos, step: int = 5) -> np.ndarray:
+    """Rank medio → percentil 0-100 en saltos de `step` (NaN se queda NaN)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = np.round(rangos / validos * 100)
+        return np.clip((pct // step) * step, 0, 100)
+
+
+def percentiles_bloque(valores: np.ndarray, step: int = 5):
+    """
+    Percentiles discretizados de cada columna de `valores` (n × k).
+    Devuelve (percentiles float con NaN, nº de valores no nulos por columna).
+    """
+    validos = (~np.isnan(valores)).sum(axis=0)
+    return discretizar(rangos_promedio(valores), validos, step=step), validos
+
+
+def columna_percentil(n: int, pos: np.ndarray, pct: np.ndarray) -> pd.arrays.IntegerArray:
+    """Columna Int64 de `n` filas con `pct` en las posiciones `pos` (NA en el resto)."""
+    enteros = np.zeros(n, dtype=np.int64)
+    nulos = np.ones(n, dtype=bool)
+    ok = ~np.isnan(pct)
+    enteros[pos[ok]] = pct[ok]
+    nulos[pos[ok]] = False
+    return pd.arrays.IntegerArray(enteros, nulos)
+
+
+def _columna_float(serie: pd.Series) -> np.ndarray:
+    """Valores de la columna como float (NaN para nulos / no numéricos), sin copiar si ya lo son."""
+    valores = serie.to_numpy()
+    if valores.dtype.kind == "f":
+        return valores
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def bloque_float32(df: pd.DataFrame, columnas, pos: np.ndarray) -> np.ndarray:
+    """
+    Bloque 2-D float32 (filas `pos` × `columnas`) de `df`, por columnas
+    (order="F"): sin copiar el DataFrame, cada columna se vuelca una vez
+    y el argsort del eje 0 recorre memoria contigua. Los scores ya son
+    float32 en el esquema, así que el rank no cambia.
+    """
+    bloque = np.empty((len(pos), len(columnas)), dtype=np.float32, order="F")
+    for j, col in enumerate(columnas):
+        bloque[:, j] = _columna_float(df[col])[pos]
+    return bloque
+
+
+def percentiles_por_rol(df: pd.DataFrame, grupos, indice=None, step: int = 5) -> pd.DataFrame:
+    """
+    Columnas "Percentil {score}" (Int64, NA fuera del rol) alineadas con `df`.
+
+    `grupos`: [(roles, scores), ...], p.ej. [(["li", "ld"], SCORES_LATERAL)];
+    cada score se compara solo entre los jugadores de sus roles.
+    `indice` (Dataset.roles) evita recorrer `df` para sacar cada rol.
+    """
+    n = len(df)
+    columnas = {}
+
+    for roles, scores in grupos:
+        scores = [c for c in scores if c in df.columns]
+        if not scores:
+            continue
+        pos = posiciones_rol(df, indice, *roles)
+        if not len(pos):
+            continue
+
+        pct, validos = percentiles_bloque(bloque_float32(df, scores, pos), step=step)
+
+        for j, col in enumerate(scores):
+            if validos[j]:
+                columnas[f"Percentil {col}"] = columna_percentil(n, pos, pct[:, j])
+
+    return pd.DataFrame(columnas, index=df.index)
+
+
+def percentiles_metricas(df_scope: pd.DataFrame, particiones: dict, indice=None, step: int = 5) -> pd.DataFrame:
+    """
+    Columnas "Percentil {métrica}" (Int64, NA fuera del rol) de todas las
+    métricas "(ROL_TAG)" de cada grupo, alineadas con `df_scope`.
+
+    `particiones`: {grupo: (roles, métricas del grupo)}, con las métricas
+    indexadas como la partición (Dataset.metricas). Un rank 2-D por grupo
+    entre los jugadores de sus roles; en las métricas negativas (pérdidas,
+    fallidas) menos es mejor, así que se rankean cambiadas de signo.
+    """
+    n = len(df_scope)
+    columnas = {}
+
+    for roles, df_metricas in particiones.values():
+        metricas = list(df_metricas.columns)
+        pos = posiciones_rol(df_scope, indice, *roles)
+        if not metricas or not len(pos):
+            continue
+
+        filas = df_metricas.index.get_indexer(df_scope.index[pos])
+        fuera = filas < 0
+        bloque = np.empty((len(pos), len(metricas)), dtype=np.float32, order="F")
+        for j, col in enumerate(metricas):
+            valores = _columna_float(df_metricas[col])[filas]
+            valores[fuera] = np.nan
+            bloque[:, j] = -valores if es_metrica_negativa(col) else valores
+
+        pct, validos = percentiles_bloque(bloque, step=step)
+        for j, col in enumerate(metricas):
+            if validos[j]:
+                columnas[f"Percentil {col}"] = columna_percentil(n, pos, pct[:, j])
+
+    return pd.DataFrame(columnas, index=df_scope.index)
+
+
+# =========================
+# POOLS DE VARIAS LIGAS (incremental)
+# =========================
+class ScoresPorLiga:
+    """
+    Scores ordenados por liga (solo entre los jugadores del rol de cada
+    score), para pools de varias ligas sin volver a ordenar desde cero.
+
+    Cada valor se guarda como clave entera `columna × M + rango denso del
+    valor en la columna` (mismo orden y mismos empates que los valores):
+    todos los scores de un rol caben en UN array ordenado por liga. Para
+    un pool de varias ligas se concatenan esos tramos ya ordenados y se
+    mezclan (argsort estable = timsort, que aprovecha los tramos: mucho
+    más barato que ordenar la unión); el rank medio de cada clave sale de
+    sus empates y, restando dónde empieza su columna, es el rank dentro
+    de su score. Se construye una vez por temporada y versión del dataset.
+    """
+
+    def __init__(self, df: pd.DataFrame, grupos, indice=None):
+        self.grupos = []
+        self.por_liga = {}  # liga → {rol: (claves ordenadas, fila de cada clave, válidos por score)}
+
+        ligas = df["Nombre_Liga"].to_numpy()
+        for g, (roles, scores) in enumerate(grupos):
+            scores = [c for c in scores if c in df.columns]
+            pos = posiciones_rol(df, indice, *roles)
+
+            # clave entera por (fila del rol, score); -1 = NaN
+            m = len(pos) + 1
+            claves = np.full((len(pos), len(scores)), -1, dtype=np.int64)
+            for j, col in enumerate(scores):
+                valores = _columna_float(df[col])[pos]
+                ok = ~np.isnan(valores)
+                _, densos = np.unique(valores[ok], return_inverse=True)
+                claves[ok, j] = j * m + densos
+
+            self.grupos.append((roles, scores, df.index.to_numpy()[pos], len(pos)))
+
+            ligas_rol = ligas[pos]
+            for liga in pd.unique(ligas_rol[pd.notna(ligas_rol)]):
+                filas_liga = np.flatnonzero(ligas_rol == liga)
+                claves_liga = claves[filas_liga]
+                filas, _ = np.nonzero(claves_liga >= 0)
+                planas = claves_liga[claves_liga >= 0]
+                orden = np.argsort(planas, kind="stable")
+                self.por_liga.setdefault(str(liga), {})[g] = (
+                    planas[orden],
+                    filas_liga[filas[orden]].astype(np.int32),
+                    (claves_liga >= 0).sum(axis=0),
+                )
+
+    def percentiles(self, df_scope: pd.DataFrame, liga_sel, indice=None, step: int = 5) -> pd.DataFrame:
+        """
+        Igual que `percentiles_por_rol(df_scope, grupos, ...)` cuando
+        `df_scope` son TODAS las filas de la partición de esas ligas.
+        """
+        n = len(df_scope)
+        ligas = [str(l) for l in liga_sel if str(l) in self.por_liga]
+        columnas = {}
+
+        for g, (roles, scores, etiquetas_rol, n_rol) in enumerate(self.grupos):
+            pos = posiciones_rol(df_scope, indice, *roles)
+            datos = [self.por_liga[l][g] for l in ligas if g in self.por_liga[l]]
+            if not scores or not len(pos) or not datos:
+                continue
+
+            # mezcla de los tramos ordenados de cada liga
+            claves = np.concatenate([d[0] for d in datos])
+            filas = np.concatenate([d[1] for d in datos])
+            validos = np.sum([d[2] for d in datos], axis=0)
+            orden = np.argsort(claves, kind="stable")
+            claves = claves[orden]
+            filas = filas[orden]
+
+            # rank medio de cada grupo de empates (posiciones 1..total)
+            total = len(claves)
+            posiciones = np.arange(1, total + 1, dtype=np.float64)
+            inicio = np.ones(total, dtype=bool)
+            inicio[1:] = claves[1:] != claves[:-1]
+            fin = np.ones(total, dtype=bool)
+            fin[:-1] = inicio[1:]
+            primero = np.maximum.accumulate(np.where(inicio, posiciones, 0.0))
+            ultimo = np.minimum.accumulate(np.where(fin, posiciones, total + 1.0)[::-1])[::-1]
+
+            # dentro de su score: restar las claves de los scores anteriores
+            columna = np.repeat(np.arange(len(scores)), validos)
+            antes = np.concatenate(([0], np.cumsum(validos)[:-1]))
+            rangos = np.full((n_rol, len(scores)), np.nan)
+            rangos[filas, columna] = (primero + ultimo) / 2 - antes[columna]
+
+            # filas del pool (etiquetas) → filas del rol
+            consulta = rangos[np.searchsorted(etiquetas_rol, df_scope.index.to_numpy()[pos])]
+            pct = discretizar(consulta, validos, step=step)
+            for j, col in enumerate(scores):
+                if validos[j]:
+                    columnas[f"Percentil {col}"] = columna_percentil(n, pos, pct[:, j])
+
+        return pd.DataFrame(columnas, index=df_scope.index)
+
+
+# =========================
+# UMBRAL DE MINUTOS (quién entra en el ranking)
+# =========================
+PASO_MINUTOS = 90
+
+
+class PercentilesPorMinutos:
+    """
+    Percentiles de un pool para TODOS los umbrales de minutos mínimos de
+    la rejilla de 90' (0, 90, 180... hasta el máximo del pool): con el
+    umbral U solo se rankean (y cuentan) los jugadores con minutos >= U.
+
+    Cada score se ordena UNA vez; los jugadores que entran con cada umbral
+    se acumulan sobre ese orden (una suma acumulada por umbral, todas en
+    la misma operación 2-D), así que el rank de cada jugador con cada
+    umbral sale de restas sobre sus grupos de empates. Mover el umbral es
+    una consulta sobre la tabla int8 (umbral × jugador × score).
+    """
+
+    def __init__(self, df_scope: pd.DataFrame, grupos, indice=None, step: int = 5, paso: int = PASO_MINUTOS):
+        self.index = df_scope.index
+        self.paso = paso
+        minutos = _columna_float(df_scope["Minutos jugados"])
+        maximo = np.nanmax(minutos) if np.isfinite(minutos).any() else 0
+        self.umbrales = np.arange(0, int(np.ceil(maximo / paso)) + 1) * paso
+        self.minutos = minutos
+        self.grupos = []  # (posiciones del rol, scores, tabla int8, válidos por umbral)
+
+        for roles, scores in grupos:
+            scores = [c for c in scores if c in df_scope.columns]
+            pos = posiciones_rol(df_scope, indice, *roles)
+            if not scores or not len(pos):
+                continue
+            # umbral 0 = todos (también los que no tienen minutos)
+            entra = minutos[pos][None, :] >= self.umbrales[:, None]
+            entra[0] = True
+
+            tabla = np.full((len(self.umbrales), len(pos), len(scores)), -1, dtype=np.int8)
+            validos = np.zeros((len(self.umbrales), len(scores)), dtype=np.int64)
+            for j, col in enumerate(scores):
+                valores = _columna_float(df_scope[col])[pos]
+                orden = np.argsort(valores, kind="stable")  # NaN al final
+                ordenados = valores[orden]
+                m = int((~np.isnan(ordenados)).sum())
+                if not m:
+                    continue
+                orden, ordenados = orden[:m], ordenados[:m]
+
+                # grupos de empates: [inicio, fin) de cada posición
+                inicio = np.ones(m, dtype=bool)
+                inicio[1:] = ordenados[1:] != ordenados[:-1]
+                primero = np.flatnonzero(inicio)[np.cumsum(inicio) - 1]
+                ultimo = np.append(np.flatnonzero(inicio)[1:], m)[np.cumsum(inicio) - 1]
+
+                # jugadores que entran, acumulados en orden de valor, por umbral
+                acumulado = np.zeros((len(self.umbrales), m + 1), dtype=np.int32)
+                np.cumsum(entra[:, orden], axis=1, out=acumulado[:, 1:])
+                menores = acumulado[:, primero]
+                iguales = acumulado[:, ultimo] - menores
+                validos[:, j] = acumulado[:, m]
+
+                pct = discretizar(menores + (iguales + 1) / 2, validos[:, j][:, None], step=step)
+                pct[~entra[:, orden]] = -1
+                tabla[:, orden, j] = pct
+
+            self.grupos.append((pos, scores, tabla, validos))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.nbytes for _, _, t, _ in self.grupos)
+
+    def elegibles(self, minutos_min: int) -> np.ndarray:
+        """Máscara de las filas del pool que se rankean con ese umbral."""
+        if minutos_min <= 0:
+            return np.ones(len(self.index), dtype=bool)
+        return self.minutos >= minutos_min
+
+    def percentiles(self, minutos_min: int) -> pd.DataFrame:
+        """
+        Columnas "Percentil {score}" (Int64) de las filas elegibles con el
+        umbral `minutos_min` (se redondea hacia abajo a la rejilla), igual
+        que `percentiles_por_rol` sobre esas filas.
+        """
+        g = min(max(int(minutos_min) // self.paso, 0), len(self.umbrales) - 1)
+        elegibles = self.elegibles(self.umbrales[g])
+        # filas del pool → filas elegibles
+        nueva = np.cumsum(elegibles) - 1
+        n = int(elegibles.sum())
+
+        columnas = {}
+        for pos, scores, tabla, validos in self.grupos:
+            dentro = elegibles[pos]
+            for j, col in enumerate(scores):
+                if validos[g, j]:
+                    pct = tabla[g, dentro, j].astype(np.float64)
+                    pct[pct < 0] = np.nan
+                    columnas[f"Percentil {col}"] = columna_percentil(n, nueva[pos[dentro]], pct)
+        return pd.DataFrame(columnas, index=self.index[elegibles])
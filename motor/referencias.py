@@ -0,0 +1,166 @@
+"""
+Percentil de cualquier valor frente a pools de referencia.
+
+Para cada (temporada, liga, score) se guarda UN array ordenado con los
+valores de los jugadores del rol de ese score. "¿Qué percentil es un
+score X en el pool P?" (P = una temporada y una o varias ligas) se
+responde con `searchsorted` sobre las ligas de P, para columnas enteras
+a la vez y sin construir ningún pool:
+
+    rank medio = (Σ nº de valores < X  +  1  +  Σ nº de valores <= X) / 2
+
+Para un jugador que está en P da exactamente su "Percentil Score ..."
+del pool; para uno de fuera, el percentil que tendría entre los de P.
+
+Los arrays de todos los scores de una (temporada, liga) van seguidos en
+uno solo de claves uint64 `nº de score << 32 | bits del float32` (los
+bits se transforman para que ordenen como el float): cada score es un
+tramo, y todos los scores de un jugador se buscan en UNA llamada. Así se
+compara, p.ej., un "Score 9" de 2025 con el pool de La Liga 2023
+(`entre_temporadas`) sin cambiar de temporada ni construir pools.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from motor.percentiles import discretizar
+from motor.registro import ROLES_PERCENTIL
+from motor.roles import posiciones_rol
+
+
+# Pool de la temporada completa dentro de `ordenados`
+TODAS = ""
+
+
+def claves_orden(valores: np.ndarray) -> np.ndarray:
+    """float32 → uint32 con el mismo orden (negativos incluidos, -0.0 = 0.0)."""
+    bits = (np.asarray(valores, dtype=np.float32) + np.float32(0)).view(np.uint32)
+    negativos = (bits >> 31).astype(bool)
+    return np.where(negativos, ~bits, bits | np.uint32(1 << 31))
+
+
+class ReferenciasPercentil:
+    """Arrays ordenados por (temporada, liga, score) de una versión del dataset."""
+
+    def __init__(self, dataset, grupos=ROLES_PERCENTIL):
+        self.dataset = dataset
+        self.roles_score = {col: roles for roles, scores in grupos for col in scores}
+        self.scores = list(self.roles_score)
+        self._por_temporada = {}
+        self._lock = threading.Lock()
+
+    def ordenados(self, temporada: str) -> dict:
+        """
+        {liga (TODAS = temporada completa): (claves uint64 ordenadas,
+        límites)}: el score j ocupa `claves[límites[j]:límites[j + 1]]`.
+        """
+        with self._lock:
+            if temporada in self._por_temporada:
+                return self._por_temporada[temporada]
+
+        df = self.dataset.temporada(temporada)
+        indice = self.dataset.roles(temporada)
+        ligas = df["Nombre_Liga"].to_numpy()
+        tramos = {}  # liga → [claves de cada score]
+        for j, col in enumerate(self.scores):
+            if col not in df.columns:
+                continue
+            pos = posiciones_rol(df, indice, *self.roles_score[col])
+            valores = np.asarray(df[col].to_numpy(dtype=np.float32, na_value=np.nan)[pos])
+            ligas_rol = ligas[pos]
+            ok = pd.notna(ligas_rol) & ~np.isnan(valores)
+            claves = np.uint64(j) << np.uint64(32) | claves_orden(valores[ok]).astype(np.uint64)
+            ligas_rol = ligas_rol[ok]
+            tramos.setdefault(TODAS, []).append(claves)
+            for liga in pd.unique(ligas_rol):
+                tramos.setdefault(str(liga), []).append(claves[ligas_rol == liga])
+
+        inicios = np.arange(len(self.scores) + 1, dtype=np.uint64) << np.uint64(32)
+        por_liga = {}
+        for liga, partes in tramos.items():
+            claves = np.sort(np.concatenate(partes))
+            por_liga[liga] = (claves, np.searchsorted(claves, inicios))
+
+        with self._lock:
+            return self._por_temporada.setdefault(temporada, por_liga)
+
+    def _rangos(self, valores: np.ndarray, j: np.ndarray, temporada: str, ligas):
+        """
+        Rank medio de cada `valores[i]` entre los del score `j[i]` en el
+        pool (NaN si no hay dato) y nº de valores del pool de ese score.
+        """
+        por_liga = self.ordenados(str(temporada))
+        ligas = [TODAS] if not ligas else [str(l) for l in ligas]
+
+        nan = np.isnan(valores)
+        x = j.astype(np.uint64) << np.uint64(32) | claves_orden(np.where(nan, 0, valores)).astype(np.uint64)
+
+        menores = np.zeros(len(x), dtype=np.int64)
+        menores_o_iguales = np.zeros(len(x), dtype=np.int64)
+        total = np.zeros(len(x), dtype=np.int64)
+        for liga in ligas:
+            if liga not in por_liga:
+                continue
+            claves, limites = por_liga[liga]
+            inicio = limites[j]
+            menores += np.searchsorted(claves, x, side="left") - inicio
+            menores_o_iguales += np.searchsorted(claves, x, side="right") - inicio
+            total += limites[j + 1] - inicio
+
+        rangos = (menores + 1 + menores_o_iguales) / 2
+        rangos[nan | (total == 0)] = np.nan
+        return rangos, total
+
+    def percentil(self, valores, score: str, temporada: str, ligas=None, step: int = 5) -> np.ndarray:
+        """
+        Percentil (0-100 en saltos de `step`, NaN si no hay dato o el pool
+        está vacío) de cada valor frente al pool `temporada` + `ligas`
+        (None = todas las ligas de la temporada).
+        """
+        x = np.atleast_1d(np.asarray(valores, dtype=np.float32))
+        if score not in self.roles_score:
+            return np.full(x.shape, np.nan)
+        j = np.full(x.shape, self.scores.index(score), dtype=np.int64)
+        rangos, total = self._rangos(x, j, temporada, ligas)
+        return discretizar(rangos, total, step=step)
+
+    def comparar(self, jugadores: pd.DataFrame, scores, pools: dict, step: int = 5) -> pd.DataFrame:
+        """
+        Percentiles de `jugadores` frente a varios pools, lado a lado.
+        `pools`: {etiqueta: (temporada, ligas)}. Columnas MultiIndex
+        (etiqueta, score), una fila por jugador.
+        """
+        columnas = {}
+        for etiqueta, (temporada, ligas) in pools.items():
+            for score in scores:
+                if score not in jugadores.columns:
+                    continue
+                valores = jugadores[score].to_numpy(dtype=np.float32, na_value=np.nan)
+                pct = self.percentil(valores, score, temporada, ligas, step=step)
+                columnas[(etiqueta, score)] = pd.Series(pct, index=jugadores.index).astype("Int64")
+        return pd.DataFrame(columnas, index=jugadores.index)
+
+    def entre_temporadas(self, valores, ligas=None, temporadas=None, step: int = 5) -> pd.DataFrame:
+        """
+        Percentiles de UN jugador frente al pool de cada temporada del
+        dataset (o de `temporadas`), con las mismas `ligas` en todas
+        (None = la temporada completa). `valores`: {score: valor}, p.ej.
+        su fila. Una fila por temporada y una columna Int64 por score; NA
+        si el jugador no tiene ese score o la liga no está esa temporada.
+        """
+        valores = pd.Series(valores)
+        scores = [c for c in valores.index if c in self.roles_score]
+        x = pd.to_numeric(valores[scores], errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+        j = np.array([self.scores.index(c) for c in scores], dtype=np.int64)
+        temporadas = list(temporadas or self.dataset.temporadas)
+
+        # 👉 todos los scores del jugador en una búsqueda por (temporada, liga)
+        pct = np.full((len(temporadas), len(scores)), np.nan)
+        for i, temporada in enumerate(temporadas):
+            rangos, total = self._rangos(x, j, temporada, ligas)
+            pct[i] = discretizar(rangos, total, step=step)
+
+        return pd.DataFrame(
+            pct, index=pd.Index(temporadas, name="Temporada"), columns=scores
+        ).astype("Int64")
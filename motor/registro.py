@@ -0,0 +1,410 @@
+"""
+Registro declarativo de columnas del dataset.
+
+- COLUMNAS_IDENTIDAD: datos del jugador que usan todas las vistas.
+- COLUMNAS_SCORE / SCORES_*: scores (y sus percentiles) por rol.
+- GRUPOS_ROL: para cada grupo de posición, los scores y las métricas
+  "(ROL_TAG)" que enseña su tabla.
+- NEGATIVE_TOKENS: métricas en las que menos es mejor (pérdidas, fallidas).
+
+Con esto el cargador lee solo las columnas que necesita cada vista
+(proyección sobre el almacén columnar).
+"""
+
+
+COLUMNAS_IDENTIDAD = [
+    "Temporada", "Nombre_Liga", "Jugador", "Pos", "Equipo", "Categoría_Liga",
+    "Edad", "Nacionalidad", "Altura", "Valor_Mercado", "Pie bueno",
+    "Minutos jugados", "Fin de contrato",
+]
+
+
+# =========================
+# LISTA GLOBAL DE TODAS LAS COLUMNAS DE SCORE (PERCENTILES)
+# =========================
+COLUMNAS_SCORE = [
+    # Porteros
+    "Score GK Portero",
+    "Score GK Atajador",
+    "Score GK Juego de Pies",
+    "Score GK Total",
+    # Laterales
+    "Score Lateral Genérico",
+    "Score Lateral Defensivo",
+    "Score Lateral Ofensivo",
+    "Score Lateral Total",
+    # Centrales
+    "Score Central Genérico",
+    "Score Central Defensivo",
+    "Score Central Combinativo",
+    "Score Central Total",
+    # MCs
+    "Score MC Genérico",
+    "Score MC Contención",
+    "Score MC Box-to-Box",
+    "Score MC Ofensivo",
+    # Extremos
+    "Score Extremo Genérico",
+    "Score Extremo Wide Out",
+    "Score Extremo Incorporación",
+    "Score Extremo Combinativo",
+    "Score Extremos Total",
+    # Delanteros
+    "Score Delantero",
+    "Score 9",
+    "Score Segundo Delantero",
+    "Score Total",
+]
+
+# =========================
+# LISTAS DE SCORES POR ROL (para percentiles por posición)
+# =========================
+SCORES_GK = [
+    "Score GK Portero",
+    "Score GK Atajador",
+    "Score GK Juego de Pies",
+    "Score GK Total",
+]
+
+SCORES_LATERAL = [
+    "Score Lateral Genérico",
+    "Score Lateral Defensivo",
+    "Score Lateral Ofensivo",
+    "Score Lateral Total",
+]
+
+SCORES_CENTRAL = [
+    "Score Central Genérico",
+    "Score Central Defensivo",
+    "Score Central Combinativo",
+    "Score Central Total",
+]
+
+SCORES_MC = [
+    "Score MC Genérico",
+    "Score MC Contención",
+    "Score MC Box-to-Box",
+    "Score MC Ofensivo",
+]
+
+SCORES_EXTREMO = [
+    "Score Extremo Genérico",
+    "Score Extremo Wide Out",
+    "Score Extremo Incorporación",
+    "Score Extremo Combinativo",
+    "Score Extremos Total",
+]
+
+SCORES_DELANTERO = [
+    "Score Delantero",
+    "Score 9",
+    "Score Segundo Delantero",
+    "Score Total",
+]
+
+# =========================
+# MÉTRICAS "(ROL_TAG)" POR GRUPO DE POSICIÓN (tablas del detalle)
+# =========================
+METRICAS_PORTEROS = [
+    "Goles Evitados (GK_PORTERO)",
+    "xG Recibidos por Gol (GK_PORTERO)",
+    "Remates por Gol (GK_PORTERO)",
+    "% Paradas (GK_PORTERO)",
+    "Precisión en Centros (GK_PORTERO)",
+    "% Pases con la Mano (GK_PORTERO)",
+    "Distancia Media de Pases (GK_PORTERO)",
+    "% Paradas Dentro del Área (GK_PORTERO)",
+    "% Pases (GK_PORTERO)",
+
+    "% Paradas Dentro del Área (GK_ATAJADOR)",
+    "% Paradas Fuera del Área (GK_ATAJADOR)",
+    "xG Parados / xG Recibidos (GK_ATAJADOR)",
+    "Remates por Gol (GK_ATAJADOR)",
+    "xG Recibidos por Gol (GK_ATAJADOR)",
+    "% Paradas (GK_ATAJADOR)",
+    "Goles Evitados (GK_ATAJADOR)",
+
+    "% Pases en Campo Propio (GK_PIES)",
+    "Acciones Fallidas en Campo Propio (GK_PIES)",
+    "Toques (GK_PIES)",
+    "Progresión de Balón (GK_PIES)",
+    "xT Pases (GK_PIES)",
+    "Pérdidas de Balón (GK_PIES)",
+]
+
+METRICAS_LATERALES = [
+    "Tackles/Fue Regateado (LAT_GENERICO)",
+    "Intercepciones (LAT_GENERICO)",
+    "Recuperaciones (LAT_GENERICO)",
+    "Presión Individual (LAT_GENERICO)",
+    "Centros Completados (LAT_GENERICO)",
+    "Centros (LAT_GENERICO)",
+    "Pérdidas Peligrosas (LAT_GENERICO)",
+    "Acciones Fallidas en Campo Propio (LAT_GENERICO)",
+    "xT en Juego (LAT_GENERICO)",
+
+    "Tackles con Éxito (LAT_DEFENSIVO)",
+    "Tackles/Fue Regateado (LAT_DEFENSIVO)",
+    "% Duelos por Bajo (LAT_DEFENSIVO)",
+    "Intercepciones (LAT_DEFENSIVO)",
+    "Centros Interceptados (LAT_DEFENSIVO)",
+    "Presión Individual (LAT_DEFENSIVO)",
+    "Duelos Aéreos Defensivos Ganados (LAT_DEFENSIVO)",
+    "% Duelos Aéreos Ganados (LAT_DEFENSIVO)",
+
+    "Profundidad (LAT_OFENSIVO)",
+    "Profundidad en el Último ⅓ (LAT_OFENSIVO)",
+    "Centros (LAT_OFENSIVO)",
+    "Peligro Esperado (xT) (LAT_OFENSIVO)",
+    "Remates Fuera del Área (LAT_OFENSIVO)",
+    "Regates Intentados (LAT_OFENSIVO)",
+    "% Regates Completados (LAT_OFENSIVO)",
+    "Acciones Fallidas en Campo Propio (LAT_OFENSIVO)",
+    "xA de Centros (LAT_OFENSIVO)",
+    "Asistencias (LAT_OFENSIVO)",
+]
+
+METRICAS_CENTRALES = [
+    "Tackles/Fue Regateado (DFC_GENERICO)",
+    "Intercepciones (DFC_GENERICO)",
+    "Recuperaciones (DFC_GENERICO)",
+    "% Duelos Defensivos (DFC_GENERICO)",
+    "Duelos Defensivos (DFC_GENERICO)",
+    "Presión Individual (DFC_GENERICO)",
+    "Duelos Aéreos (DFC_GENERICO)",
+    "Pérdidas Peligrosas (DFC_GENERICO)",
+    "Pases Progresivos Completados (DFC_GENERICO)",
+    "Progresión de Balón con Conducción (DFC_GENERICO)",
+    "Acciones Fallidas en Campo Propio (DFC_GENERICO)",
+
+    "% Duelos por Bajo (DFC_DEFENSIVO)",
+    "Tackles/Fue Regateado ⅓ (DFC_DEFENSIVO)",
+    "Tackles/Fue Regateado (DFC_DEFENSIVO)",
+    "Intercepciones (DFC_DEFENSIVO)",
+    "Despejes (DFC_DEFENSIVO)",
+    "Duelos Aéreos Defensivos Ganados (DFC_DEFENSIVO)",
+    "Duelos Aéreos (DFC_DEFENSIVO)",
+
+    "Pases Progresivos Completados (DFC_COMBINATIVO)",
+    "xT Pases (DFC_COMBINATIVO)",
+    "% Pases Adelante Completados (DFC_COMBINATIVO)",
+    "Progreso Medio de Conducciones (DFC_COMBINATIVO)",
+    "Pérdidas de Balón (DFC_COMBINATIVO)",
+    "Acciones Fallidas en Campo Propio (DFC_COMBINATIVO)",
+]
+
+METRICAS_MC = [
+    "% Pases (MC_GENERICO)",
+    "Tackles/Fue Regateado Último ⅓ (MC_GENERICO)",
+    "Intercepciones (MC_GENERICO)",
+    "Recuperaciones (MC_GENERICO)",
+    "Presión Individual (MC_GENERICO)",
+    "% Pases en Campo Contrario (MC_GENERICO)",
+    "% Pases en Campo Propio (MC_GENERICO)",
+    "Progresión de Balón (MC_GENERICO)",
+    "Entradas al Área (MC_GENERICO)",
+    "Participación xG Último ⅓ (MC_GENERICO)",
+    "Conducciones Progresivas (MC_GENERICO)",
+    "Eficiencia Aérea (MC_GENERICO)",
+    "Pases Progresivos Recibidos en Campo Rival (MC_GENERICO)",
+
+    "Duelos Defensivos (MC_CONTENCION)",
+    "Tackles/Fue Regateado (MC_CONTENCION)",
+    "Intercepciones (MC_CONTENCION)",
+    "Recuperaciones (MC_CONTENCION)",
+    "Duelos Aéreos Defensivos Ganados (MC_CONTENCION)",
+    "% Duelos Aéreos Defensivos (MC_CONTENCION)",
+    "% Pases (MC_CONTENCION)",
+    "% Retención del Balón (MC_CONTENCION)",
+    "Pases Progresivos Completados (MC_CONTENCION)",
+    "% Pases Adelante Completados (MC_CONTENCION)",
+
+    "xA en Jugada (MC_OFENSIVO)",
+    "Peligro Esperado (xT) (MC_OFENSIVO)",
+    "Remates (MC_OFENSIVO)",
+    "Secuencia acabada en tiro (MC_OFENSIVO)",
+    "xG/90 (MC_OFENSIVO)",
+    "xG a Puerta (MC_OFENSIVO)",
+    "Goles sin Penaltis (MC_OFENSIVO)",
+    "Pases en Profundidad (MC_OFENSIVO)",
+    "Entradas al Área (MC_OFENSIVO)",
+
+    "Pases a Campo Contrario (MC_B2B)",
+    "Pases Progresivos Recibidos en Campo Rival (MC_B2B)",
+    "xG/90 (MC_B2B)",
+    "Remates Fuera del Área (MC_B2B)",
+    "Contribución Goleadora (MC_B2B)",
+    "xT en Juego (MC_B2B)",
+    "Profundidad en el Último ⅓ (MC_B2B)",
+    "Conducciones Progresivas (MC_B2B)",
+    "Profundidad (MC_B2B)",
+]
+
+METRICAS_EXTREMOS = [
+    "Acciones Agresivas (EXT_GENERICO)",
+    "Duelos Defensivos (EXT_GENERICO)",
+    "Presión Individual (EXT_GENERICO)",
+    "xG/90 (EXT_GENERICO)",
+    "Centros (EXT_GENERICO)",
+    "% Centros Completados (EXT_GENERICO)",
+    "Contribución Goleadora (EXT_GENERICO)",
+    "Asistencias Esperadas (EXT_GENERICO)",
+    "Peligro Esperado (xT) (EXT_GENERICO)",
+    "Regates Completados Campo Contrario (EXT_GENERICO)",
+    "% Regates Completados Último ⅓ (EXT_GENERICO)",
+    "Profundidad (EXT_GENERICO)",
+
+    "Participación xG Último ⅓ (EXT_WIDEOUT)",
+    "Profundidad (EXT_WIDEOUT)",
+    "Conducción y Ocasión (EXT_WIDEOUT)",
+    "Toques (EXT_WIDEOUT)",
+    "xA de Centros (EXT_WIDEOUT)",
+    "xT Regates (EXT_WIDEOUT)",
+    "Regates Intentados Último ⅓ (EXT_WIDEOUT)",
+    "% Regates Completados Último ⅓ (EXT_WIDEOUT)",
+
+    "Goles sin Penaltis (EXT_INCORPORACION)",
+    "Finalización (EXT_INCORPORACION)",
+    "xG por Remate (EXT_INCORPORACION)",
+    "Toques en Área Rival (EXT_INCORPORACION)",
+    "Remates a Puerta (EXT_INCORPORACION)",
+    "Fueras de Juego (EXT_INCORPORACION)",
+    "% Toques de Balón en el Área Rival en su Equipo (EXT_INCORPORACION)",
+    "Profundidad (EXT_INCORPORACION)",
+
+    "xT Pases por 100 Pases (EXT_COMBINATIVO)",
+    "xT en Juego (EXT_COMBINATIVO)",
+    "Progresión de Balón (EXT_COMBINATIVO)",
+    "Asistencias Esperadas (EXT_COMBINATIVO)",
+    "Contribución Goleadora (EXT_COMBINATIVO)",
+    "Ocasiones Creadas (EXT_COMBINATIVO)",
+]
+
+METRICAS_DELANTEROS = [
+    "Goles sin Penaltis (DEL_DELANTERO)",
+    "Remates (DEL_DELANTERO)",
+    "xG por Remate (DEL_DELANTERO)",
+    "% Remates a Puerta (DEL_DELANTERO)",
+    "xG/90 (DEL_DELANTERO)",
+    "Pérdidas de Balón (DEL_DELANTERO)",
+    "% Retención del Balón en Campo Rival (DEL_DELANTERO)",
+    "Toques (DEL_DELANTERO)",
+    "% Regates Completados (DEL_DELANTERO)",
+    "Peligro Esperado (xT) (DEL_DELANTERO)",
+    "% Duelos Aéreos Ganados Campo Rival (DEL_DELANTERO)",
+    "Distancia Media de Conducción (DEL_DELANTERO)",
+    "Presión Individual Campo Rival (DEL_DELANTERO)",
+
+    "% Duelos Aéreos Ganados Campo Rival (DEL_9)",
+    "Duelos Aéreos Totales Campo Rival (DEL_9)",
+    "xG por Goles sin Penaltis (DEL_9)",
+    "xG/90 (DEL_9)",
+    "Pases Largos Recibidos (DEL_9)",
+    "Pases Progresivos Recibidos en el Área (DEL_9)",
+    "Participación xG (DEL_9)",
+    "% Retención del Balón en Campo Rival (DEL_9)",
+
+    "xT en Juego (DEL_SEGUNDO)",
+    "Asistencias Esperadas (DEL_SEGUNDO)",
+    "% Pases en Juego en el Área Rival en su Equipo (DEL_SEGUNDO)",
+    "Pases Completados al Área en Juego (DEL_SEGUNDO)",
+    "Conducciones Progresivas (DEL_SEGUNDO)",
+    "Conducción y Tiro (DEL_SEGUNDO)",
+    "Progreso Medio de Conducciones (DEL_SEGUNDO)",
+]
+
+
+# =========================
+# REGISTRO: grupo → scores (en el orden de la tabla) + métricas
+# =========================
+GRUPOS_ROL = {
+    "porteros": {"scores": SCORES_GK, "metricas": METRICAS_PORTEROS},
+    "laterales": {"scores": SCORES_LATERAL, "metricas": METRICAS_LATERALES},
+    "centrales": {"scores": SCORES_CENTRAL, "metricas": METRICAS_CENTRALES},
+    "mc": {
+        "scores": [
+            "Score MC Genérico",
+            "Score MC Contención",
+            "Score MC Ofensivo",
+            "Score MC Box-to-Box",
+        ],
+        "metricas": METRICAS_MC,
+    },
+    "extremos": {"scores": SCORES_EXTREMO, "metricas": METRICAS_EXTREMOS},
+    "delanteros": {"scores": SCORES_DELANTERO, "metricas": METRICAS_DELANTEROS},
+}
+
+# Posición del campograma / rankings → grupo de columnas
+GRUPO_POR_POSICION = {
+    "Portero": "porteros",
+    "Lateral izquierdo": "laterales",
+    "Lateral derecho": "laterales",
+    "DFC Izquierdo": "centrales",
+    "DFC Derecho": "centrales",
+    "MC Contención": "mc",
+    "MC Box to Box": "mc",
+    "MC Ofensivo": "mc",
+    "Extremo Izquierdo": "extremos",
+    "Extremo Derecho": "extremos",
+    "Delantero": "delanteros",
+}
+
+# Pools de percentiles: cada score se compara solo entre los jugadores de
+# sus roles (códigos de `motor.roles`: "li" = LI/CAI, "ei" = EI/MI...)
+ROLES_PERCENTIL = [
+    (("gk",), SCORES_GK),
+    (("li", "ld"), SCORES_LATERAL),
+    (("dfc",), SCORES_CENTRAL),
+    (("mc",), SCORES_MC),
+    (("ei", "ed"), SCORES_EXTREMO),
+    (("dc",), SCORES_DELANTERO),
+]
+
+# Roles de cada grupo (percentiles de sus métricas "(ROL_TAG)")
+ROLES_GRUPO = {
+    "porteros": ("gk",),
+    "laterales": ("li", "ld"),
+    "centrales": ("dfc",),
+    "mc": ("mc",),
+    "extremos": ("ei", "ed"),
+    "delanteros": ("dc",),
+}
+
+# =========================
+# MÉTRICAS NEGATIVAS (menos = mejor)
+# =========================
+NEGATIVE_TOKENS = [
+    "PÉRDIDAS", "PERDIDAS",
+    "ACCIONES FALLIDAS",
+    "FALLIDAS",
+]
+
+
+def es_metrica_negativa(col: str) -> bool:
+    up = str(col).upper()
+    return any(tok in up for tok in NEGATIVE_TOKENS)
+
+
+def columnas_tabla(grupo: str) -> list:
+    """
+    Columnas de la tabla de un grupo, en orden: identidad, cada score
+    seguido de su percentil, y las métricas del grupo (cada una seguida
+    de su percentil, si el pool los trae).
+    """
+    cfg = GRUPOS_ROL[grupo]
+    cols = list(COLUMNAS_IDENTIDAD)
+    for score in cfg["scores"]:
+        cols += [score, f"Percentil {score}"]
+    for metrica in cfg["metricas"]:
+        cols += [metrica, f"Percentil {metrica}"]
+    return cols
+
+
+def columnas_base() -> list:
+    """Identidad + todos los scores: lo mínimo para percentiles y campograma."""
+    return COLUMNAS_IDENTIDAD + COLUMNAS_SCORE
+
+
+def columnas_metricas(grupo: str) -> list:
+    """Solo las métricas "(ROL_TAG)" de un grupo."""
+    return list(GRUPOS_ROL[grupo]["metricas"])
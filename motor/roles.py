@@ -0,0 +1,171 @@
+"""
+Clasificación de la columna "Pos" por grupos de rol.
+
+Semántica (la del antiguo `match_posicion` fila a fila): la posición se
+pasa a mayúsculas, los separadores "/ - , | ;" cuentan como espacios y
+un jugador pertenece a un rol si ALGÚN token es igual o EMPIEZA por
+alguno de sus códigos ("POR1" → portero, "MCD / DFC" → mc y dfc).
+
+"Empezar un token" equivale a que el código aparezca al principio del
+texto o justo después de un espacio, así que cada rol es UNA expresión
+regular (`str.contains`).
+
+Los valores distintos de "Pos" ("DFC", "MCD / MC", "ED, DC"...) son unas
+decenas frente a miles de filas: cada valor se clasifica UNA vez en el
+proceso y se guarda como máscara de bits (un bit por rol). A las filas se
+llega con los códigos de la categórica, y cada partición guarda el
+resultado en la columna `rol_bits` (uint16): filtrar por rol es un AND.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Grupo de rol → códigos de posición (el orden fija el bit de cada rol)
+ROLES = {
+    "gk": {"POR", "GK", "PORTERO", "GOALKEEPER"},
+    "li": {"LI", "CAI"},
+    "ld": {"LD", "CAD"},
+    "dfc": {"DFC"},
+    "mc": {"MCD", "MC", "MCO"},
+    "ei": {"EI", "MI"},
+    "ed": {"ED", "MD"},
+    "dc": {"DC", "SDI", "SDD"},
+}
+
+SEPARADORES_POS = r"[/\-,|;]"
+
+# Columna con la máscara de roles de cada fila
+COLUMNA_ROLES = "rol_bits"
+MAX_ROLES = 16  # uint16
+
+# Valor de "Pos" → máscara de bits (memo del proceso)
+_BITS_POR_VALOR = {}
+
+
+def bit_rol(rol: str) -> int:
+    return 1 << list(ROLES).index(rol)
+
+
+def registrar_rol(rol: str, codigos) -> None:
+    """
+    Añade un grupo de rol nuevo (o redefine uno existente). Hay que
+    registrarlo al importar, antes de cargar particiones: las columnas
+    `rol_bits` ya calculadas no se rehacen.
+    """
+    if rol not in ROLES and len(ROLES) >= MAX_ROLES:
+        raise ValueError(f"Máximo {MAX_ROLES} roles")
+    ROLES[rol] = {str(c).upper() for c in codigos}
+    _BITS_POR_VALOR.clear()
+
+
+def _patron_rol(codigos) -> str:
+    alternativas = "|".join(re.escape(c) for c in sorted(codigos, key=len, reverse=True))
+    return rf"(?:^|\s)(?:{alternativas})"
+
+
+def bits_por_valor(valores) -> np.ndarray:
+    """Máscara de roles (uint16) de cada valor de "Pos", con memo por valor."""
+    valores = [str(v) for v in valores]
+    nuevos = pd.Series(sorted({v for v in valores if v not in _BITS_POR_VALOR}), dtype="string")
+
+    if len(nuevos):
+        texto = nuevos.str.upper().str.replace(SEPARADORES_POS, " ", regex=True)
+        bits = np.zeros(len(nuevos), dtype=np.uint16)
+        for rol, codigos in ROLES.items():
+            encaja = texto.str.contains(_patron_rol(codigos), regex=True)
+            bits[encaja.to_numpy(dtype=bool)] |= bit_rol(rol)
+        _BITS_POR_VALOR.update(zip(nuevos.tolist(), bits.tolist()))
+
+    return np.array([_BITS_POR_VALOR[v] for v in valores], dtype=np.uint16)
+
+
+def bits_roles(serie_pos: pd.Series) -> np.ndarray:
+    """
+    Máscara de roles de cada fila: se clasifican los valores distintos y
+    se expanden con los códigos (de la categórica o de `factorize`).
+    Los NaN no tienen ningún rol.
+    """
+    if isinstance(serie_pos.dtype, pd.CategoricalDtype):
+        codigos = serie_pos.cat.codes.to_numpy()
+        distintos = serie_pos.cat.categories
+    else:
+        codigos, distintos = pd.factorize(serie_pos)
+
+    tabla = np.append(bits_por_valor(distintos), np.uint16(0))
+    # código -1 (NaN) → última posición de `tabla` (sin roles)
+    return tabla[codigos]
+
+
+def con_roles(df: pd.DataFrame) -> pd.DataFrame:
+    """Añade (o recalcula) la columna `rol_bits` a partir de "Pos"."""
+    if "Pos" not in df.columns:
+        return df
+    return df.assign(**{COLUMNA_ROLES: bits_roles(df["Pos"])})
+
+
+def mascara_rol(df: pd.DataFrame, *roles) -> pd.Series:
+    """
+    Máscara de jugadores que encajan en ALGUNO de los roles indicados
+    (`mascara_rol(df, "li", "ld")` = laterales). Usa `rol_bits` si la
+    partición ya la trae; si no, la calcula sobre la marcha.
+    """
+    if COLUMNA_ROLES in df.columns:
+        bits = df[COLUMNA_ROLES].to_numpy()
+    else:
+        bits = bits_roles(df["Pos"])
+
+    buscados = 0
+    for rol in roles:
+        buscados |= bit_rol(rol)
+    return pd.Series((bits & buscados) != 0, index=df.index)
+
+
+# =========================
+# ÍNDICE DE ROLES (rol → posiciones de fila)
+# =========================
+def indice_roles(df: pd.DataFrame) -> dict:
+    """
+    {rol: posiciones (int32, ordenadas) de las filas de `df` con ese rol}.
+    Se construye sobre la partición completa (RangeIndex), así que la
+    posición de cada fila coincide con su etiqueta en cualquier filtro
+    posterior de esa partición.
+    """
+    if COLUMNA_ROLES in df.columns:
+        bits = df[COLUMNA_ROLES].to_numpy()
+    else:
+        bits = bits_roles(df["Pos"])
+    return {rol: np.flatnonzero(bits & bit_rol(rol)).astype(np.int32) for rol in ROLES}
+
+
+def posiciones_rol(df: pd.DataFrame, indice, *roles) -> np.ndarray:
+    """
+    Posiciones (en `df`) de las filas con ALGUNO de los roles, usando el
+    índice de roles (sin recorrer `df`). `df` es un filtro de la partición
+    que conserva el orden (temporada / liga / minutos...): se cruzan las
+    posiciones del rol con sus etiquetas con `searchsorted`.
+    Sin índice (o con un `df` reordenado) se usa `mascara_rol`.
+    """
+    etiquetas_df = df.index
+    if (
+        indice is None
+        or not pd.api.types.is_integer_dtype(etiquetas_df.dtype)
+        or not etiquetas_df.is_monotonic_increasing
+    ):
+        return np.flatnonzero(mascara_rol(df, *roles).to_numpy())
+
+    etiquetas = indice[roles[0]]
+    for rol in roles[1:]:
+        etiquetas = np.union1d(etiquetas, indice[rol])
+
+    etiquetas_df = etiquetas_df.to_numpy()
+    pos = np.searchsorted(etiquetas_df, etiquetas)
+    dentro = pos < len(etiquetas_df)
+    pos = pos[dentro]
+    return pos[etiquetas_df[pos] == etiquetas[dentro]]
+
+
+def filas_rol(df: pd.DataFrame, indice, *roles) -> pd.DataFrame:
+    """Filas de `df` con ALGUNO de los roles, con `take` (ver `posiciones_rol`)."""
+    return df.take(posiciones_rol(df, indice, *roles))
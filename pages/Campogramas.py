@@ -63,193 +63,164 @@ if "logueado" in st.session_state and not st.session_state.logueado:
 
 
 import os
-import zipfile
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-# =========================
-# CARGA AUTOMÁTICA DEL DATASET (desde 4 ZIP)
-# =========================
-@st.cache_data
-def load_data():
-    base_dir = "data"  # carpeta dentro de tu repo / proyecto
-    zip_files = [
-        "noviembre_2025_temporada_2022.zip",
-        "noviembre_2025_temporada_2023.zip",
-        "noviembre_2025_temporada_2024.zip",
-        "noviembre_2025_temporada_2025.zip",
-    ]
-
-    dfs = []
+# Copy-on-Write: las particiones cacheadas con st.cache_resource son el MISMO
+# objeto para todas las sesiones; con CoW cualquier derivado (filtro, columna
+# nueva...) copia solo lo que modifica y nunca toca el DataFrame compartido.
+pd.set_option("mode.copy_on_write", True)
+
+from motor.cache_pools import (
+    ENV_CACHE_DISCO_DIR,
+    CacheDiscoPools,
+    CachePools,
+    clave_disco,
+    clave_seleccion,
+)
+from motor.dataset import Dataset, GestorDataset
+from motor.registro import (
+    COLUMNAS_SCORE,
+    GRUPO_POR_POSICION,
+    GRUPOS_ROL,
+    ROLES_GRUPO,
+    ROLES_PERCENTIL,
+    columnas_tabla,
+    es_metrica_negativa,
+)
+from motor.percentiles import (
+    PASO_MINUTOS,
+    PercentilesPorMinutos,
+    percentiles_metricas,
+    percentiles_por_rol,
+)
+from motor.roles import filas_rol
 
-    for zname in zip_files:
-        zpath = os.path.join(base_dir, zname)
+BASE_DIR_DATOS = "data"  # carpeta dentro de tu repo / proyecto
 
-        # Leer el primer CSV que haya dentro del zip (sin extraer a disco)
-        with zipfile.ZipFile(zpath, "r") as z:
-            csv_names = [n for n in z.namelist() if n.lower().endswith(".csv")]
-            if not csv_names:
-                raise ValueError(f"El zip {zname} no contiene ningún CSV")
-            csv_inside = csv_names[0]
+# Origen de los "Percentil Score ..." de un pool (df_pool.attrs)
+ATTR_ORIGEN = "origen_percentiles"
+ORIGEN_CUBO = "cubo"
+ORIGEN_APROXIMADO = "aproximado"
+ORIGEN_VIVO = "vivo"
 
-            with z.open(csv_inside) as f:
-                df_part = pd.read_csv(
-                    f,
-                    sep=None,
-                    engine="python",
-                    encoding="utf-8-sig"
-                )
-                dfs.append(df_part)
 
-    df = pd.concat(dfs, ignore_index=True)
+# =========================
+# CARGA POR TEMPORADA (lazy) + RECARGA EN CALIENTE
+#  👉 solo se lee la partición de la temporada que se selecciona
+#  👉 un hilo vigila data/: si llega o cambia un ZIP, se ingiere y se
+#     publica una versión nueva del dataset sin bloquear a nadie
+#  👉 cada sesión sigue con su versión hasta "Aplicar Percentiles"
+#  👉 cada ZIP se convierte una vez a Arrow IPC (data/*.arrow) y se abre
+#     con memory mapping; OSAN_CARGA_SERIE=1 fuerza la ingesta en serie
+#  👉 OSAN_INFORME_MEMORIA=1 imprime en la consola del servidor la memoria
+#     por columna de cada partición al cargarla
+# =========================
+@st.cache_resource
+def gestor_dataset() -> GestorDataset:
+    """Un gestor por proceso (compartido por todas las sesiones)."""
+    gestor = GestorDataset(BASE_DIR_DATOS)
+    # 👉 cada versión nueva llega con los cubos de percentiles de las
+    #    temporadas que cambiaron; la primera vez, python -m motor.cubo
+    gestor.iniciar_vigilancia()
+    return gestor
 
-    # Normalizamos Fin de contrato a string SIEMPRE
-    if "Fin de contrato" in df.columns:
-        df["Fin de contrato"] = df["Fin de contrato"].astype(str)
 
-    return df
+def dataset_sesion() -> Dataset:
+    """
+    Versión del dataset con la que trabaja esta sesión. Las particiones
+    son compartidas y de SOLO LECTURA: los derivados se hacen con
+    filtros / columnas nuevas (CoW).
+    """
+    if "dataset" not in st.session_state:
+        st.session_state["dataset"] = gestor_dataset().actual
+    return st.session_state["dataset"]
 
 
+@st.cache_resource
+def cache_pools() -> CachePools:
+    """Pools de percentiles compartidos por todas las sesiones (LRU en bytes)."""
+    return CachePools()
 
-# =========================
-# LISTA GLOBAL DE TODAS LAS COLUMNAS DE SCORE (PERCENTILES)
-# =========================
-COLUMNAS_SCORE = [
-    # Porteros
-    "Score GK Portero",
-    "Score GK Atajador",
-    "Score GK Juego de Pies",
-    "Score GK Total",
-    # Laterales
-    "Score Lateral Genérico",
-    "Score Lateral Defensivo",
-    "Score Lateral Ofensivo",
-    "Score Lateral Total",
-    # Centrales
-    "Score Central Genérico",
-    "Score Central Defensivo",
-    "Score Central Combinativo",
-    "Score Central Total",
-    # MCs
-    "Score MC Genérico",
-    "Score MC Contención",
-    "Score MC Box-to-Box",
-    "Score MC Ofensivo",
-    # Extremos
-    "Score Extremo Genérico",
-    "Score Extremo Wide Out",
-    "Score Extremo Incorporación",
-    "Score Extremo Combinativo",
-    "Score Extremos Total",
-    # Delanteros
-    "Score Delantero",
-    "Score 9",
-    "Score Segundo Delantero",
-    "Score Total",
-]
 
-# =========================
-# LISTAS DE SCORES POR ROL (para percentiles por posición)
-# =========================
-SCORES_GK = [
-    "Score GK Portero",
-    "Score GK Atajador",
-    "Score GK Juego de Pies",
-    "Score GK Total",
-]
-
-SCORES_LATERAL = [
-    "Score Lateral Genérico",
-    "Score Lateral Defensivo",
-    "Score Lateral Ofensivo",
-    "Score Lateral Total",
-]
-
-SCORES_CENTRAL = [
-    "Score Central Genérico",
-    "Score Central Defensivo",
-    "Score Central Combinativo",
-    "Score Central Total",
-]
-
-SCORES_MC = [
-    "Score MC Genérico",
-    "Score MC Contención",
-    "Score MC Box-to-Box",
-    "Score MC Ofensivo",
-]
-
-SCORES_EXTREMO = [
-    "Score Extremo Genérico",
-    "Score Extremo Wide Out",
-    "Score Extremo Incorporación",
-    "Score Extremo Combinativo",
-    "Score Extremos Total",
-]
-
-SCORES_DELANTERO = [
-    "Score Delantero",
-    "Score 9",
-    "Score Segundo Delantero",
-    "Score Total",
-]
+@st.cache_resource
+def cache_disco_pools() -> CacheDiscoPools:
+    """Los mismos pools en Parquet (data/cache_pools): sobreviven a reinicios."""
+    directorio = os.environ.get(ENV_CACHE_DISCO_DIR, os.path.join(BASE_DIR_DATOS, "cache_pools"))
+    return CacheDiscoPools(directorio)
 
 
-# =========================
-# MATCH ROBUSTO DE POSICIONES
-# =========================
-def match_posicion(valor, codigos_validos):
+def pool_percentiles(dataset: Dataset, clave: tuple) -> pd.DataFrame:
     """
-    Devuelve True si algún token de la cadena coincide o empieza por
-    alguno de los códigos (POR, GK, etc.).
-    Ejemplos válidos: "POR", "POR1", "GK", "GK2", "POR / DFC".
+    Pool de la clave (temporada, categorías, ligas, versión, aproximado,
+    métricas): de la caché
+    en memoria, si no del disco y, si tampoco, calculado con
+    `construir_pool_percentiles`. Es de SOLO LECTURA (lo comparten las
+    sesiones con la misma selección).
     """
-    if pd.isna(valor):
-        return False
-    text = str(valor).upper()
-    for sep in ["/", "-", ",", "|", ";"]:
-        text = text.replace(sep, " ")
-    tokens = [t.strip() for t in text.split() if t.strip()]
-    for tok in tokens:
-        for cod in codigos_validos:
-            if tok == cod or tok.startswith(cod):
-                return True
-    return False
-
+    temporada, categoria_sel, liga_sel, _, aproximado, metricas = clave
+
+    def construir():
+        return construir_pool_percentiles(
+            dataset.temporada(temporada), temporada, list(categoria_sel), list(liga_sel),
+            dataset.roles(temporada), dataset.cubo(temporada), dataset.scores_por_liga(temporada),
+            dataset.resumenes(temporada) if aproximado else None,
+            particiones_metricas(dataset, temporada) if metricas else None,
+        )
 
-# =========================
-# HELPER: CONVERTIR SCORES A PERCENTILES POR RANK (0-100, PASOS DE 5)
-#  👉 CREA COLUMNAS NUEVAS: "Percentil {Score ...}"
-#  👉 NO USA MINUTOS, SOLO RANK DENTRO DEL SUBSET QUE LE PASES
-# =========================
-def aplicar_percentiles(df: pd.DataFrame, columnas, step: int = 5) -> pd.DataFrame:
-    """
-    Crea columnas nuevas de percentil para cada columna en `columnas`.
+    return cache_pools().obtener(
+        clave,
+        lambda: cache_disco_pools().obtener(
+            clave_disco(clave, dataset.huella(temporada)), construir
+        ),
+    )
 
-    - Percentil basado en rank (el mejor valor del subset siempre tiene 100).
-    - Se discretiza en saltos de `step` (por defecto 5): 0, 5, 10, ..., 100.
-    - No usa minutos ni filtros adicionales; eso se hace fuera.
-    """
-    df = df.copy()
 
-    for col in columnas:
-        if col not in df.columns:
-            continue
+def particiones_metricas(dataset: Dataset, temporada: str) -> dict:
+    """{grupo: (roles, métricas "(ROL_TAG)" del grupo)} para `percentiles_metricas`."""
+    return {
+        grupo: (ROLES_GRUPO[grupo], dataset.metricas(temporada, grupo))
+        for grupo in GRUPOS_ROL
+    }
 
-        serie = pd.to_numeric(df[col], errors="coerce")
-        if serie.dropna().empty:
-            continue
 
-        new_col = f"Percentil {col}"
+def pool_elegibles(dataset: Dataset, clave: tuple, df_pool: pd.DataFrame, minutos_min: int) -> pd.DataFrame:
+    """
+    `df_pool` rankeado solo entre los jugadores con >= `minutos_min`
+    minutos. Los percentiles de todos los umbrales (rejilla de 90') se
+    precalculan una vez por pool y se comparten en la misma caché:
+    mover el umbral es una consulta, no un re-rank. El pool de cada
+    umbral también se guarda (`clave + (minutos_min,)`): los reruns de
+    Streamlit con el mismo umbral no repiten nada (tampoco el rank de
+    las métricas).
+    """
+    if minutos_min <= 0:
+        return df_pool
+    temporada = clave[0]
+
+    def construir():
+        por_minutos = cache_pools().obtener(
+            clave + ("minutos",),
+            lambda: PercentilesPorMinutos(
+                df_pool.drop(columns=[c for c in df_pool.columns if c.startswith("Percentil ")]),
+                ROLES_PERCENTIL, dataset.roles(temporada),
+            ),
+        )
+        df_pct = por_minutos.percentiles(minutos_min)
+        df_base = df_pool.loc[df_pct.index, [c for c in df_pool.columns if not c.startswith("Percentil ")]]
+        partes = [df_base, df_pct]
+        if clave[5]:
+            # percentiles de métricas: un rank 2-D por grupo, sobre los elegibles
+            partes.append(percentiles_metricas(df_base, particiones_metricas(dataset, temporada), dataset.roles(temporada)))
+        return pd.concat(partes, axis=1)
 
-        # rank percentil 0-100 dentro del subset
-        pct = (serie.rank(pct=True) * 100).round()
+    return cache_pools().obtener(clave + (minutos_min,), construir)
 
-        # discretización en saltos de `step`
-        bucket = (pct // step) * step
-        df[new_col] = bucket.clip(0, 100).astype("Int64")
 
-    return df
+def con_metricas(df_rol: pd.DataFrame, dataset: Dataset, temporada: str, grupo: str) -> pd.DataFrame:
+    """Añade a un ranking por rol las métricas de su grupo."""
+    return df_rol.join(dataset.metricas(temporada, grupo), how="left")
 
 
 # =========================
@@ -1040,6 +1011,10 @@ def mostrar_tabla_aggrid(df_tabla: pd.DataFrame, key: str, df_base: pd.DataFrame
     """
     tabla = df_tabla.copy()
 
+    # float32 → float64 (si no, el JSON de AgGrid sale con ruido: 45.2999992371)
+    for col in tabla.columns[tabla.dtypes == "float32"]:
+        tabla[col] = tabla[col].astype("float64").round(6)
+
     # 🔢 métricas con paréntesis → 2 decimales
     for col in tabla.columns:
         if "(" in col and ")" in col:
@@ -1121,16 +1096,10 @@ def mostrar_tabla_aggrid(df_tabla: pd.DataFrame, key: str, df_base: pd.DataFrame
 
     # =========================
     # ✅ FIX: NEGATIVOS (menos = mejor) -> invert=True
+    #  👉 los "Percentil ..." de métricas ya vienen invertidos
     # =========================
-    NEGATIVE_TOKENS = [
-        "PÉRDIDAS", "PERDIDAS",
-        "ACCIONES FALLIDAS",
-        "FALLIDAS",
-    ]
-
     def is_negative_metric(colname: str) -> bool:
-        up = str(colname).upper()
-        return any(tok in up for tok in NEGATIVE_TOKENS)
+        return es_metrica_negativa(colname) and not str(colname).startswith("Percentil ")
 
     # ====== Tus coloreados (igual que antes) ======
     cols_percentil_score = [c for c in tabla.columns if c.startswith("Percentil Score ")]
@@ -1426,87 +1395,102 @@ def limpiar_header(colname: str) -> str:
 # =========================
 # HELPERS DE RANKING
 # =========================
-def rankings_defensivos(df_filtrado: pd.DataFrame):
-    # helper: ordena priorizando el SCORE bruto;
-    # si no existe, usa el percentil como backup.
-    def sort_by_score(df_pos, score_col_name):
-        if score_col_name in df_pos.columns:
-            return df_pos.sort_values(score_col_name, ascending=False).copy()
+TOP_K = 10  # filas de cada tabla (el campograma dibuja las 3 primeras)
+
+
+def top_k_posiciones(bloque: np.ndarray, k: int) -> list:
+    """
+    Para cada columna de `bloque` (n × m), posiciones de sus `k` mayores,
+    de mayor a menor (NaN al final, empates por orden de fila como un
+    sort estable). Un `np.partition` para todas las columnas a la vez:
+    solo se ordenan los k de cada una (y los empatados con el k-ésimo).
+    """
+    negados = -bloque
+    negados[np.isnan(negados)] = np.inf
+    if k >= len(negados):
+        return [np.argsort(negados[:, j], kind="stable") for j in range(negados.shape[1])]
+
+    cortes = np.partition(negados, k - 1, axis=0)[k - 1]
+    posiciones = []
+    for j, corte in enumerate(cortes):
+        candidatos = np.flatnonzero(negados[:, j] <= corte)
+        posiciones.append(candidatos[np.argsort(negados[candidatos, j], kind="stable")][:k])
+    return posiciones
+
+
+def bloque_orden(df_pos: pd.DataFrame, *scores) -> np.ndarray:
+    """
+    Columnas por las que se ordena cada ranking: el SCORE bruto; si no
+    existe, el percentil como backup; si tampoco, el orden de las filas.
+    """
+    columnas = []
+    for score in scores:
+        col = next((c for c in (score, f"Percentil {score}") if c in df_pos.columns), None)
+        if col is None:
+            columnas.append(np.zeros(len(df_pos)))
         else:
-            pct_col = f"Percentil {score_col_name}"
-            if pct_col in df_pos.columns:
-                return df_pos.sort_values(pct_col, ascending=False).copy()
-            return df_pos.copy()
-
-    # PORTEROS
-    df_por = df_filtrado[
-        df_filtrado["Pos"].apply(
-            lambda v: match_posicion(v, {"POR", "GK", "PORTERO", "GOALKEEPER"})
-        )
-    ].copy()
-    df_por = sort_by_score(df_por, "Score GK Total")
-
-    # LATERAL IZQUIERDO
-    df_li = df_filtrado[
-        df_filtrado["Pos"].apply(lambda v: match_posicion(v, {"LI", "CAI"}))
-    ].copy()
-    df_li = sort_by_score(df_li, "Score Lateral Total")
-
-    # DFC (pool común)
-    df_dfc_pool = df_filtrado[
-        df_filtrado["Pos"].apply(lambda v: match_posicion(v, {"DFC"}))
-    ].copy()
-    df_dfc_pool = sort_by_score(df_dfc_pool, "Score Central Total")
-
-    # mismo split que tenías antes: uno sí, uno no
-    df_dfc_der = df_dfc_pool.iloc[0::2].copy()
-    df_dfc_izq = df_dfc_pool.iloc[1::2].copy()
-
-    # LATERAL DERECHO
-    df_ld = df_filtrado[
-        df_filtrado["Pos"].apply(lambda v: match_posicion(v, {"LD", "CAD"}))
-    ].copy()
-    df_ld = sort_by_score(df_ld, "Score Lateral Total")
-
-    # MC (pool para los 3 roles)
-    df_mc_pool = df_filtrado[
-        df_filtrado["Pos"].apply(lambda v: match_posicion(v, {"MCD", "MC", "MCO"}))
-    ].copy()
-
-    df_mc_contencion = sort_by_score(df_mc_pool.copy(), "Score MC Contención")
-    df_mc_b2b       = sort_by_score(df_mc_pool.copy(), "Score MC Box-to-Box")
-    df_mc_ofensivo  = sort_by_score(df_mc_pool.copy(), "Score MC Ofensivo")
-
-    # EXTREMOS
-    df_ei = df_filtrado[
-        df_filtrado["Pos"].apply(lambda v: match_posicion(v, {"EI", "MI"}))
-    ].copy()
-    df_ei = sort_by_score(df_ei, "Score Extremos Total")
-
-    df_ed = df_filtrado[
-        df_filtrado["Pos"].apply(lambda v: match_posicion(v, {"ED", "MD"}))
-    ].copy()
-    df_ed = sort_by_score(df_ed, "Score Extremos Total")
-
-    # DELANTEROS
-    df_dc = df_filtrado[
-        df_filtrado["Pos"].apply(lambda v: match_posicion(v, {"DC", "SDI", "SDD"}))
-    ].copy()
-    df_dc = sort_by_score(df_dc, "Score 9")
+            columnas.append(pd.to_numeric(df_pos[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan))
+    return np.column_stack(columnas)
+
+
+def orden_completo(df_pos: pd.DataFrame, score_col_name: str) -> pd.DataFrame:
+    """Subset entero ordenado por su score (solo para "Ver lista completa")."""
+    return df_pos.take(top_k_posiciones(bloque_orden(df_pos, score_col_name), len(df_pos))[0])
+
+
+def rankings_defensivos(df_filtrado: pd.DataFrame, indice=None, k: int = TOP_K):
+    """
+    (rankings, score_cols, subsets):
+      - rankings: top-k de cada posición, ya ordenado (campograma y tablas),
+      - subsets: TODOS los jugadores de cada posición, sin ordenar
+        (recuentos, escala de color de las tablas y lista completa).
+    Nada se ordena entero: cada top-k sale de un `np.partition`.
+    """
+    # `indice`: rol → posiciones de fila de la partición (Dataset.roles);
+    # cada subset por rol es un `take`, sin recorrer df_filtrado entero.
+    def top(df_pos, score_col_name):
+        return df_pos.take(top_k_posiciones(bloque_orden(df_pos, score_col_name), k)[0])
+
+    subsets = {
+        "Portero": filas_rol(df_filtrado, indice, "gk"),
+        "Lateral izquierdo": filas_rol(df_filtrado, indice, "li"),
+        "Lateral derecho": filas_rol(df_filtrado, indice, "ld"),
+        "Extremo Izquierdo": filas_rol(df_filtrado, indice, "ei"),
+        "Extremo Derecho": filas_rol(df_filtrado, indice, "ed"),
+        "Delantero": filas_rol(df_filtrado, indice, "dc"),
+    }
+
+    # DFC (pool común): mismo split que tenías antes, uno sí, uno no, sobre
+    # el orden del pool. Qué lado toca depende de TODO el orden, así que se
+    # ordena la columna del score (numpy), no el DataFrame
+    df_dfc_pool = filas_rol(df_filtrado, indice, "dfc")
+    orden_dfc = top_k_posiciones(bloque_orden(df_dfc_pool, "Score Central Total"), len(df_dfc_pool))[0]
+    subsets["DFC Derecho"] = df_dfc_pool.take(np.sort(orden_dfc[0::2]))
+    subsets["DFC Izquierdo"] = df_dfc_pool.take(np.sort(orden_dfc[1::2]))
+
+    # MC (pool para los 3 roles): los tres top-k en una pasada sobre el
+    # bloque de sus scores; el pool no se copia por rol
+    df_mc_pool = filas_rol(df_filtrado, indice, "mc")
+    top_mc = top_k_posiciones(
+        bloque_orden(df_mc_pool, "Score MC Contención", "Score MC Box-to-Box", "Score MC Ofensivo"), k
+    )
+    for pos_nombre in ("MC Contención", "MC Box to Box", "MC Ofensivo"):
+        subsets[pos_nombre] = df_mc_pool
 
     rankings = {
-        "Portero": df_por,
-        "Lateral izquierdo": df_li,
-        "DFC Izquierdo": df_dfc_izq,
-        "DFC Derecho": df_dfc_der,
-        "Lateral derecho": df_ld,
-        "MC Contención": df_mc_contencion,
-        "MC Box to Box": df_mc_b2b,
-        "MC Ofensivo": df_mc_ofensivo,
-        "Extremo Izquierdo": df_ei,
-        "Extremo Derecho": df_ed,
-        "Delantero": df_dc,
+        "Portero": top(subsets["Portero"], "Score GK Total"),
+        "Lateral izquierdo": top(subsets["Lateral izquierdo"], "Score Lateral Total"),
+        "DFC Izquierdo": df_dfc_pool.take(orden_dfc[1:2 * k:2]),
+        "DFC Derecho": df_dfc_pool.take(orden_dfc[0:2 * k:2]),
+        "Lateral derecho": top(subsets["Lateral derecho"], "Score Lateral Total"),
+        "MC Contención": df_mc_pool.take(top_mc[0]),
+        "MC Box to Box": df_mc_pool.take(top_mc[1]),
+        "MC Ofensivo": df_mc_pool.take(top_mc[2]),
+        "Extremo Izquierdo": top(subsets["Extremo Izquierdo"], "Score Extremos Total"),
+        "Extremo Derecho": top(subsets["Extremo Derecho"], "Score Extremos Total"),
+        "Delantero": top(subsets["Delantero"], "Score 9"),
     }
+    subsets = {pos: subsets[pos] for pos in rankings}
 
     # este dict lo usas en otros sitios → lo dejo igual
     score_cols = {
@@ -1523,14 +1507,17 @@ def rankings_defensivos(df_filtrado: pd.DataFrame):
         "Delantero": "Score 9",
     }
 
-    return rankings, score_cols
+    return rankings, score_cols, subsets
 
 
 
 # =========================
 # HELPER: CONSTRUIR POOL DE PERCENTILES (POR ROL)
 # =========================
-def construir_pool_percentiles(df, temporada_sel, categoria_sel, liga_sel):
+def construir_pool_percentiles(
+    df, temporada_sel, categoria_sel, liga_sel, indice=None, cubo=None, por_liga=None,
+    resumenes=None, metricas=None,
+):
     """
     Devuelve df_pool: jugadores de esa temporada / liga / categoría,
     con COLUMNAS_SCORE convertidos a percentiles (0-100, saltos de 5),
@@ -1539,11 +1526,24 @@ def construir_pool_percentiles(df, temporada_sel, categoria_sel, liga_sel):
     Ejemplo:
       - Score GK Portero → percentil solo entre porteros.
       - Score 9 / Score Segundo Delantero → solo entre delanteros (DC/SDI/SDD).
-    """
-    df_scope = df.copy()
 
-    if temporada_sel:
-        df_scope = df_scope[df_scope["Temporada"] == temporada_sel]
+    `indice` (Dataset.roles) da las filas de cada rol en la partición: los
+    subsets se sacan con `take` cruzando esas filas con la selección.
+
+    `cubo` (Dataset.cubo): pools de una liga, una categoría o la temporada
+    completa ya precalculados (motor.cubo).
+    `por_liga` (Dataset.scores_por_liga): pools de varias ligas mezclando
+    los tramos ya ordenados de cada liga (argsort estable). El resto, en vivo.
+    `resumenes` (Dataset.resumenes, solo en modo aproximado): pools sin
+    filtro de liga con resúmenes de cuantiles fusionados (motor.aproximado).
+    `metricas` ({grupo: (roles, métricas)}, opcional): añade también
+    "Percentil {métrica}" de todas las métricas "(ROL_TAG)" de cada grupo.
+    """
+    # `df` es la partición compartida (solo lectura) de `temporada_sel`:
+    # todas sus filas son de esa temporada (la del nombre del ZIP), así
+    # que no se filtra por la columna "Temporada". No se copia; los
+    # filtros de abajo ya crean DataFrames nuevos
+    df_scope = df
 
     if categoria_sel:
         df_scope = df_scope[df_scope["Categoría_Liga"].isin(categoria_sel)]
@@ -1554,58 +1554,95 @@ def construir_pool_percentiles(df, temporada_sel, categoria_sel, liga_sel):
     if df_scope.empty:
         return pd.DataFrame()
 
-    # Base sin percentiles todavía
-    df_pool = df_scope.copy()
-
-    # Helper: aplicar percentiles a un subconjunto (máscara) y
-    # copiar solo las columnas "Percentil ..." a df_pool
-    def aplicar_en_subset(mask, score_cols):
-        if not mask.any():
-            return
-        sub = df_scope[mask].copy()
-        sub_pct = aplicar_percentiles(sub, score_cols, step=5)
-        pct_cols = [c for c in sub_pct.columns if c.startswith("Percentil ")]
-        if not pct_cols:
-            return
-        df_pool.loc[mask, pct_cols] = sub_pct[pct_cols]
-
-    # ---- PORTEROS ----
-    mask_gk = df_scope["Pos"].apply(
-        lambda v: match_posicion(v, {"POR", "GK", "PORTERO", "GOALKEEPER"})
-    )
-    aplicar_en_subset(mask_gk, SCORES_GK)
+    # Todos los "Percentil Score ..." de todos los roles: del cubo si el
+    # pool está precalculado, de los scores ordenados por liga si es una
+    # selección solo de ligas; si no, en vivo y en una pasada
+    # (motor.percentiles): cada score solo entre los jugadores de su rol
+    #   porteros (GK) · laterales (LI/LD/CAI/CAD) · centrales (DFC)
+    #   MC (MCD/MC/MCO) · extremos (EI/MI/ED/MD) · delanteros (DC/SDI/SDD)
+    # Se añaden de una vez (NA fuera del rol), sin copiar subsets
+    df_pct = None
+    origen = ORIGEN_VIVO
+    if cubo is not None:
+        df_pct = cubo.percentiles(categoria_sel, liga_sel, df_scope.index)
+        if df_pct is not None:
+            origen = ORIGEN_CUBO
+    if df_pct is None and resumenes is not None and not liga_sel:
+        # 👉 los resúmenes son de ligas enteras: el pool tiene que ser todas
+        #    las filas de sus ligas (categoría = conjunto de ligas)
+        ligas_scope = df_scope["Nombre_Liga"].dropna().unique()
+        if df["Nombre_Liga"].isin(ligas_scope).sum() == len(df_scope):
+            df_pct = resumenes.percentiles(df_scope, ligas_scope, indice, step=5)
+            origen = ORIGEN_APROXIMADO
+    if df_pct is None and por_liga is not None and liga_sel and not categoria_sel:
+        df_pct = por_liga.percentiles(df_scope, liga_sel, indice, step=5)
+    if df_pct is None:
+        df_pct = percentiles_por_rol(df_scope, ROLES_PERCENTIL, indice, step=5)
+    partes = [df_scope, df_pct]
+    if metricas:
+        # 👉 un rank 2-D por grupo; pérdidas / fallidas invertidas
+        partes.append(percentiles_metricas(df_scope, metricas, indice, step=5))
+    df_pool = pd.concat(partes, axis=1)
+
+    # 👉 de dónde salieron los percentiles (viaja con el pool por las cachés,
+    #    también en el Parquet): la UI solo avisa del error si son aproximados
+    df_pool.attrs[ATTR_ORIGEN] = origen
+    return df_pool
 
-    # ---- LATERALES (LI / LD / CAI / CAD) ----
-    mask_lat = df_scope["Pos"].apply(
-        lambda v: match_posicion(v, {"LI", "LD", "CAI", "CAD"})
-    )
-    aplicar_en_subset(mask_lat, SCORES_LATERAL)
 
-    # ---- CENTRALES (DFC) ----
-    mask_dfc = df_scope["Pos"].apply(
-        lambda v: match_posicion(v, {"DFC"})
-    )
-    aplicar_en_subset(mask_dfc, SCORES_CENTRAL)
+# =========================
+# HELPER: COMPARAR UN JUGADOR CON OTRAS TEMPORADAS
+# =========================
+def mostrar_comparacion_temporadas(df_filtrado: pd.DataFrame, dataset: Dataset, pool_info: dict):
+    """
+    Percentiles de un jugador frente al pool de cada temporada del dataset
+    (¿su "Score 9" de 2025 habría sido top-10% en La Liga 2023?).
+    Sale de los scores ordenados de cada temporada (Dataset.referencias):
+    no cambia la temporada de la sesión ni construye pools, y no se
+    calcula nada hasta que se elige un jugador.
+    """
+    with st.expander("Comparar jugador con otras temporadas"):
+        etiquetas = (
+            df_filtrado["Jugador"].astype(str) + " · " + df_filtrado["Equipo"].astype(str)
+        ).to_dict()
+        # 👉 sin jugador por defecto: el cuerpo del expander corre en cada
+        #    rerun y cada temporada de la tabla carga su partición
+        fila_sel = st.selectbox(
+            "Jugador",
+            list(etiquetas),
+            index=None,
+            placeholder="Elige un jugador",
+            format_func=etiquetas.get,
+            key="comparar_jugador",
+        )
+        if fila_sel is None:
+            return
+        fila = df_filtrado.loc[fila_sel]
+
+        opciones = ["Liga del jugador", "Todas las ligas"]
+        if pool_info.get("liga"):
+            opciones.insert(0, "Ligas del pool actual")
+        referencia = st.radio("Pool de referencia", opciones, horizontal=True, key="comparar_pool")
+        if referencia == "Ligas del pool actual":
+            ligas = pool_info["liga"]
+        elif referencia == "Liga del jugador":
+            ligas = [fila["Nombre_Liga"]]
+        else:
+            ligas = None
 
-    # ---- MC (MCD / MC / MCO) ----
-    mask_mc = df_scope["Pos"].apply(
-        lambda v: match_posicion(v, {"MCD", "MC", "MCO"})
-    )
-    aplicar_en_subset(mask_mc, SCORES_MC)
+        # 👉 solo los scores de su rol (los que tienen percentil en el pool)
+        scores = [
+            c for c in COLUMNAS_SCORE
+            if c in fila.index and pd.notna(fila.get(f"Percentil {c}"))
+        ]
+        if not scores:
+            st.write("El jugador no tiene scores de ningún rol.")
+            return
 
-    # ---- EXTREMOS (EI / MI / ED / MD) ----
-    mask_ext = df_scope["Pos"].apply(
-        lambda v: match_posicion(v, {"EI", "MI", "ED", "MD"})
-    )
-    aplicar_en_subset(mask_ext, SCORES_EXTREMO)
+        tabla = dataset.referencias.entre_temporadas(fila[scores], ligas)
+        st.dataframe(tabla, use_container_width=True)
 
-    # ---- DELANTEROS (DC / SDI / SDD) ----
-    mask_del = df_scope["Pos"].apply(
-        lambda v: match_posicion(v, {"DC", "SDI", "SDD"})
-    )
-    aplicar_en_subset(mask_del, SCORES_DELANTERO)
 
-    return df_pool
 def _pct_border_color(pct):
     if pct is None:
         return "#999999"
@@ -1916,13 +1953,14 @@ def app():
 
     st.header("Campogramas y Rankings por Posición")
 
-    df = load_data()
+    dataset = dataset_sesion()
+    indice_temporadas = dataset.indice
 
     # ====== SIDEBAR FILTROS ======
     st.sidebar.subheader("Filtros")
 
     # === Temporada (por defecto 2025) ===
-    temporadas = sorted(df["Temporada"].dropna().unique())
+    temporadas = sorted(indice_temporadas)
     default_index = 0
     for i, t in enumerate(temporadas):
         if str(t) == "2025":
@@ -1931,9 +1969,37 @@ def app():
 
     temporada_sel = st.sidebar.selectbox("Temporada", temporadas, index=default_index)
 
+    # 👉 si la temporada (o la del pool) cambió de snapshot, la versión de
+    #    la sesión ya no puede leerla: se pasa a la vigente
+    clave_previa = st.session_state.get("pool_clave")
+    en_uso = {temporada_sel} if clave_previa is None else {temporada_sel, clave_previa[0]}
+    vigente = gestor_dataset().para_temporadas(dataset, en_uso)
+    if vigente is not dataset:
+        dataset = st.session_state["dataset"] = vigente
+        indice_temporadas = dataset.indice
+        if clave_previa is not None:
+            info = st.session_state["pool_info"]
+            st.session_state["pool_clave"] = clave_seleccion(
+                info["temporada"], info["categoria"], info["liga"],
+                dataset.version, clave_previa[4], clave_previa[5],
+            )
+        st.sidebar.info("La temporada se actualizó en data/: se usa la última versión de los datos.")
+
+    # Solo se carga la partición de la temporada seleccionada
+    df = dataset.temporada(temporada_sel)
+
+    # Ligas / categorías: del índice si la temporada ya estaba ingerida,
+    # si no, de la propia partición recién cargada
+    resumen = indice_temporadas.get(temporada_sel)
+    if resumen is None:
+        resumen = {
+            "categorias": sorted(df["Categoría_Liga"].dropna().unique()) if "Categoría_Liga" in df.columns else [],
+            "ligas": sorted(df["Nombre_Liga"].dropna().unique()) if "Nombre_Liga" in df.columns else [],
+        }
+
     # ========= Selección Categoría_Liga (afecta a percentiles) =========
-    if "Categoría_Liga" in df.columns and df["Categoría_Liga"].notna().any():
-        opciones_categoria = sorted(df[df["Temporada"] == temporada_sel]["Categoría_Liga"].dropna().unique())
+    if resumen["categorias"]:
+        opciones_categoria = list(resumen["categorias"])
         categoria_sel = st.sidebar.multiselect(
             "Categoría de Liga",
             options=opciones_categoria,
@@ -1943,8 +2009,8 @@ def app():
         categoria_sel = []
 
     # ========= Selección Liga / Competición (afecta a percentiles) =========
-    if "Nombre_Liga" in df.columns and df["Nombre_Liga"].notna().any():
-        opciones_liga = sorted(df[df["Temporada"] == temporada_sel]["Nombre_Liga"].dropna().unique())
+    if resumen["ligas"]:
+        opciones_liga = list(resumen["ligas"])
 
         default_ligas = []
         for liga_nombre in opciones_liga:
@@ -1963,39 +2029,90 @@ def app():
     else:
         liga_sel = []
 
-    # ======= POOL DE PERCENTILES (df_pool en session_state) =======
-    if "df_pool_percentiles" not in st.session_state:
-        df_pool = construir_pool_percentiles(df, temporada_sel, categoria_sel, liga_sel)
-        st.session_state["df_pool_percentiles"] = df_pool
+    aproximado = st.sidebar.checkbox(
+        "Percentiles aproximados (más rápido)",
+        value=False,
+        disabled=bool(liga_sel),
+        help="Solo sin filtro de Liga: fusiona resúmenes de cuantiles de cada liga "
+             "en lugar de ordenar todo el pool. Se indica la cota de error.",
+    )
+    con_pct_metricas = st.sidebar.checkbox(
+        "Percentiles de métricas",
+        value=False,
+        help="Percentil de cada métrica (ROL_TAG) dentro del pool, entre los "
+             "jugadores de su rol. En pérdidas / fallidas, menos es mejor.",
+    )
+
+    # ======= POOL DE PERCENTILES (caché compartida; la sesión guarda la clave) =======
+    if "pool_clave" not in st.session_state:
+        st.session_state["pool_clave"] = clave_seleccion(
+            temporada_sel, categoria_sel, liga_sel, dataset.version, aproximado, con_pct_metricas
+        )
         st.session_state["pool_info"] = {
             "temporada": temporada_sel,
             "categoria": categoria_sel,
             "liga": liga_sel,
-            "n_jugadores": len(df_pool),
         }
 
+    vigente = gestor_dataset().actual
+    if vigente is not dataset:
+        st.sidebar.info("Hay datos nuevos en data/: pulsa «Aplicar Percentiles» para usarlos.")
+
     if st.sidebar.button("Aplicar Percentiles"):
-        df_pool = construir_pool_percentiles(df, temporada_sel, categoria_sel, liga_sel)
-        st.session_state["df_pool_percentiles"] = df_pool
+        # 👉 al aplicar, la sesión pasa a la última versión del dataset
+        if vigente is not dataset and temporada_sel in vigente.zips:
+            dataset = st.session_state["dataset"] = vigente
+        st.session_state["pool_clave"] = clave_seleccion(
+            temporada_sel, categoria_sel, liga_sel, dataset.version, aproximado, con_pct_metricas
+        )
         st.session_state["pool_info"] = {
             "temporada": temporada_sel,
             "categoria": categoria_sel,
             "liga": liga_sel,
-            "n_jugadores": len(df_pool),
         }
 
-    df_pool = st.session_state.get("df_pool_percentiles", pd.DataFrame())
-    pool_info = st.session_state.get("pool_info", {})
+    df_pool = pool_percentiles(dataset, st.session_state["pool_clave"])
+    pool_info = {**st.session_state["pool_info"], "n_jugadores": len(df_pool)}
 
     if df_pool.empty:
         st.warning("No hay datos para esa combinación de Temporada / Categoría / Liga.")
         return
 
-    # ========= Sliders de segmentación (NO afectan al cálculo de percentiles) =========
-    # Rango de minutos sobre df_pool (que YA está percentilizado)
+    # Rango de minutos sobre el pool completo (no cambia con el umbral)
     min_minutos = int(df_pool["Minutos jugados"].min())
     max_minutos = int(df_pool["Minutos jugados"].max())
 
+    # ========= Minutos mínimos para el ranking (SÍ afecta a percentiles) =========
+    # 👉 los de menos minutos no se rankean ni cuentan en el pool
+    minutos_ranking = st.sidebar.slider(
+        "Minutos mínimos para el ranking",
+        min_value=0,
+        max_value=-(-max(max_minutos, 0) // PASO_MINUTOS) * PASO_MINUTOS,
+        value=0,
+        step=PASO_MINUTOS,
+        key="minutos_ranking",
+    )
+    # 👉 solo si el pool salió de los resúmenes (no del cubo ni en vivo) y
+    #    el umbral de minutos no lo ha recalculado en exacto
+    if df_pool.attrs.get(ATTR_ORIGEN) == ORIGEN_APROXIMADO and minutos_ranking <= 0:
+        ligas_pool = df_pool["Nombre_Liga"].dropna().unique()
+        error = dataset.resumenes(pool_info["temporada"]).error_maximo(ligas_pool)
+        st.sidebar.caption(
+            f"Percentiles aproximados: error ≤ ±{error:.1f} puntos antes de redondear "
+            "a saltos de 5 (puede mover un salto)."
+        )
+
+    df_pool = pool_elegibles(dataset, st.session_state["pool_clave"], df_pool, minutos_ranking)
+    pool_info["n_jugadores"] = len(df_pool)
+    pool_info["minutos_min"] = minutos_ranking
+
+    if df_pool.empty:
+        st.warning("Ningún jugador del pool llega a esos minutos.")
+        return
+
+    # ========= Sliders de segmentación (NO afectan al cálculo de percentiles) =========
+    # Rango de minutos sobre df_pool (que YA está percentilizado)
+
     # Inicializamos en session_state si no existe
     if "filtro_minutos" not in st.session_state:
         st.session_state["filtro_minutos"] = (min_minutos, max_minutos)
@@ -2146,7 +2263,7 @@ def app():
     )
 
     # ====== SEGMENTACIÓN FINAL (NO recalcula percentiles) ======
-    df_filtrado = df_pool.copy()
+    df_filtrado = df_pool
 
     df_filtrado = df_filtrado[
         (df_filtrado["Minutos jugados"] >= minutos_min_sel) &
@@ -2194,525 +2311,145 @@ def app():
         return
 
     # ===== Rankings y 11 ideal =====
-    rankings, score_cols = rankings_defensivos(df_filtrado)
+    temporada_pool = pool_info.get("temporada", temporada_sel)
+    rankings, score_cols, subsets = rankings_defensivos(df_filtrado, dataset.roles(temporada_pool))
 
     with st.expander("Recuento de jugadores por posición"):
-        for k, v in rankings.items():
+        for k, v in subsets.items():
             st.write(f"{k}: {len(v)} jugadores")
 
     fig = dibujar_campograma_defensivo(rankings, score_cols, pool_info.get("temporada", temporada_sel), liga_str)
     st.pyplot(fig, use_container_width=True)
 
+    mostrar_comparacion_temporadas(df_filtrado, dataset, pool_info)
+
     # =========================
     # DETALLE POR POSICIÓN
     # =========================
     st.subheader("Listas por posición")
 
+    # Las métricas "(ROL_TAG)" de cada grupo solo se leen aquí, para las tablas
+    rankings = {
+        pos: con_metricas(df_pos, dataset, temporada_pool, GRUPO_POR_POSICION[pos])
+        for pos, df_pos in rankings.items()
+    }
+    # subsets completos (escala de color): los 3 MC comparten el mismo pool
+    unidos = {}
+    for pos, df_pos in subsets.items():
+        clave = (id(df_pos), GRUPO_POR_POSICION[pos])
+        if clave not in unidos:
+            unidos[clave] = con_metricas(df_pos, dataset, temporada_pool, GRUPO_POR_POSICION[pos])
+        subsets[pos] = unidos[clave]
+
+    def tabla_posicion(pos: str, cols_exist: list, key: str):
+        """Top-k de la posición; con "Ver lista completa", todo el subset ordenado (solo entonces)."""
+        if st.toggle("Ver lista completa", key=f"completa_{key}"):
+            df_pos = orden_completo(subsets[pos], score_cols[pos])
+        else:
+            df_pos = rankings[pos]
+        tabla = pd.DataFrame(columns=cols_exist) if df_pos.empty else df_pos[cols_exist]
+        mostrar_tabla_aggrid(tabla, key=key, df_base=subsets[pos])
+
     # ===== PORTEROS =====
-    columnas_gk = [
-        "Temporada","Nombre_Liga","Jugador","Pos","Equipo","Categoría_Liga",
-        "Edad","Nacionalidad","Altura","Valor_Mercado","Pie bueno",
-        "Minutos jugados","Fin de contrato",
-
-        "Score GK Portero",
-        "Percentil Score GK Portero",
-        "Score GK Atajador",
-        "Percentil Score GK Atajador",
-        "Score GK Juego de Pies",
-        "Percentil Score GK Juego de Pies",
-        "Score GK Total",
-        "Percentil Score GK Total",
-
-       'Goles Evitados (GK_PORTERO)', 'xG Recibidos por Gol (GK_PORTERO)',
-       'Remates por Gol (GK_PORTERO)', '% Paradas (GK_PORTERO)',
-       'Precisión en Centros (GK_PORTERO)', '% Pases con la Mano (GK_PORTERO)',
-       'Distancia Media de Pases (GK_PORTERO)',
-       '% Paradas Dentro del Área (GK_PORTERO)', '% Pases (GK_PORTERO)',
-       '% Paradas Dentro del Área (GK_ATAJADOR)',
-       '% Paradas Fuera del Área (GK_ATAJADOR)',
-       'xG Parados / xG Recibidos (GK_ATAJADOR)',
-       'Remates por Gol (GK_ATAJADOR)', 'xG Recibidos por Gol (GK_ATAJADOR)',
-       '% Paradas (GK_ATAJADOR)', 'Goles Evitados (GK_ATAJADOR)',
-       '% Pases en Campo Propio (GK_PIES)',
-       'Acciones Fallidas en Campo Propio (GK_PIES)', 'Toques (GK_PIES)',
-       'Progresión de Balón (GK_PIES)', 'xT Pases (GK_PIES)',
-       'Pérdidas de Balón (GK_PIES)',
-    ]
+    columnas_gk = columnas_tabla("porteros")
     st.subheader("Porteros")
     cols_exist = [c for c in columnas_gk if c in rankings["Portero"].columns]
     if cols_exist:
-        if rankings["Portero"].empty:
-            tabla_gk = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_gk = rankings["Portero"][cols_exist].head(10)
-
-            
-        mostrar_tabla_aggrid(tabla_gk, key="tabla_porteros", df_base=rankings["Portero"])
+        tabla_posicion("Portero", cols_exist, key="tabla_porteros")
     else:
         st.write("No hay columnas de porteros disponibles en el dataset.")
 
     # ===== LATERALES =====
-    columnas_laterales = [
-        "Temporada","Nombre_Liga","Jugador","Pos","Equipo","Categoría_Liga",
-        "Edad","Nacionalidad","Altura","Valor_Mercado","Pie bueno",
-        "Minutos jugados","Fin de contrato",
-
-        "Score Lateral Genérico",
-        "Percentil Score Lateral Genérico",
-        "Score Lateral Defensivo",
-        "Percentil Score Lateral Defensivo",
-        "Score Lateral Ofensivo",
-        "Percentil Score Lateral Ofensivo",
-        "Score Lateral Total",
-        "Percentil Score Lateral Total",
-
-        'Tackles/Fue Regateado (LAT_GENERICO)',
-       'Intercepciones (LAT_GENERICO)', 'Recuperaciones (LAT_GENERICO)',
-       'Presión Individual (LAT_GENERICO)',
-       'Centros Completados (LAT_GENERICO)', 'Centros (LAT_GENERICO)',
-       'Pérdidas Peligrosas (LAT_GENERICO)',
-       'Acciones Fallidas en Campo Propio (LAT_GENERICO)',
-       'xT en Juego (LAT_GENERICO)', 'Tackles con Éxito (LAT_DEFENSIVO)',
-       'Tackles/Fue Regateado (LAT_DEFENSIVO)',
-       '% Duelos por Bajo (LAT_DEFENSIVO)', 'Intercepciones (LAT_DEFENSIVO)',
-       'Centros Interceptados (LAT_DEFENSIVO)',
-       'Presión Individual (LAT_DEFENSIVO)',
-       'Duelos Aéreos Defensivos Ganados (LAT_DEFENSIVO)',
-       '% Duelos Aéreos Ganados (LAT_DEFENSIVO)', 'Profundidad (LAT_OFENSIVO)',
-       'Profundidad en el Último ⅓ (LAT_OFENSIVO)', 'Centros (LAT_OFENSIVO)',
-       'Peligro Esperado (xT) (LAT_OFENSIVO)',
-       'Remates Fuera del Área (LAT_OFENSIVO)',
-       'Regates Intentados (LAT_OFENSIVO)',
-       '% Regates Completados (LAT_OFENSIVO)',
-       'Acciones Fallidas en Campo Propio (LAT_OFENSIVO)',
-       'xA de Centros (LAT_OFENSIVO)', 'Asistencias (LAT_OFENSIVO)',
-    ]
+    columnas_laterales = columnas_tabla("laterales")
 
     st.subheader("Laterales Izquierdos")
     cols_exist = [c for c in columnas_laterales if c in rankings["Lateral izquierdo"].columns]
     if cols_exist:
-        if rankings["Lateral izquierdo"].empty:
-            tabla_li = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_li = rankings["Lateral izquierdo"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_li, key="tabla_laterales_izq", df_base=rankings["Lateral izquierdo"])
+        tabla_posicion("Lateral izquierdo", cols_exist, key="tabla_laterales_izq")
     else:
         st.write("No hay columnas de laterales izquierdos disponibles en el dataset.")
 
     st.subheader("Laterales Derechos")
     cols_exist = [c for c in columnas_laterales if c in rankings["Lateral derecho"].columns]
     if cols_exist:
-        if rankings["Lateral derecho"].empty:
-            tabla_ld = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_ld = rankings["Lateral derecho"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_ld, key="tabla_laterales_der", df_base=rankings["Lateral derecho"])
+        tabla_posicion("Lateral derecho", cols_exist, key="tabla_laterales_der")
     else:
         st.write("No hay columnas de laterales derechos disponibles en el dataset.")
 
     # ===== DEFENSAS CENTRALES =====
-    columnas_dfc = [
-        "Temporada","Nombre_Liga","Jugador","Pos","Equipo","Categoría_Liga",
-        "Edad","Nacionalidad","Altura","Valor_Mercado","Pie bueno",
-        "Minutos jugados","Fin de contrato",
-
-        "Score Central Genérico",
-        "Percentil Score Central Genérico",
-        "Score Central Defensivo",
-        "Percentil Score Central Defensivo",
-        "Score Central Combinativo",
-        "Percentil Score Central Combinativo",
-        "Score Central Total",
-        "Percentil Score Central Total",
-
-        'Tackles/Fue Regateado (DFC_GENERICO)',
-       'Intercepciones (DFC_GENERICO)', 'Recuperaciones (DFC_GENERICO)',
-       '% Duelos Defensivos (DFC_GENERICO)',
-       'Duelos Defensivos (DFC_GENERICO)', 'Presión Individual (DFC_GENERICO)',
-       'Duelos Aéreos (DFC_GENERICO)', 'Pérdidas Peligrosas (DFC_GENERICO)',
-       'Pases Progresivos Completados (DFC_GENERICO)',
-       'Progresión de Balón con Conducción (DFC_GENERICO)',
-       'Acciones Fallidas en Campo Propio (DFC_GENERICO)',
-       '% Duelos por Bajo (DFC_DEFENSIVO)',
-       'Tackles/Fue Regateado ⅓ (DFC_DEFENSIVO)',
-       'Tackles/Fue Regateado (DFC_DEFENSIVO)',
-       'Intercepciones (DFC_DEFENSIVO)', 'Despejes (DFC_DEFENSIVO)',
-       'Duelos Aéreos Defensivos Ganados (DFC_DEFENSIVO)',
-       'Duelos Aéreos (DFC_DEFENSIVO)',
-       'Pases Progresivos Completados (DFC_COMBINATIVO)',
-       'xT Pases (DFC_COMBINATIVO)',
-       '% Pases Adelante Completados (DFC_COMBINATIVO)',
-       'Progreso Medio de Conducciones (DFC_COMBINATIVO)',
-       'Pérdidas de Balón (DFC_COMBINATIVO)',
-       'Acciones Fallidas en Campo Propio (DFC_COMBINATIVO)',
-    ]
+    columnas_dfc = columnas_tabla("centrales")
 
     st.subheader("Defensas Centrales Izquierdos")
     cols_exist = [c for c in columnas_dfc if c in rankings["DFC Izquierdo"].columns]
     if cols_exist:
-        if rankings["DFC Izquierdo"].empty:
-            tabla_dfc_izq = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_dfc_izq = rankings["DFC Izquierdo"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_dfc_izq, key="tabla_dfc_izq", df_base=rankings["DFC Izquierdo"])
+        tabla_posicion("DFC Izquierdo", cols_exist, key="tabla_dfc_izq")
     else:
         st.write("No hay columnas de DFC Izquierdo disponibles en el dataset.")
 
     st.subheader("Defensas Centrales Derechos")
     cols_exist = [c for c in columnas_dfc if c in rankings["DFC Derecho"].columns]
     if cols_exist:
-        if rankings["DFC Derecho"].empty:
-            tabla_dfc_der = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_dfc_der = rankings["DFC Derecho"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_dfc_der, key="tabla_dfc_der", df_base=rankings["DFC Derecho"])
+        tabla_posicion("DFC Derecho", cols_exist, key="tabla_dfc_der")
     else:
         st.write("No hay columnas de DFC Derecho disponibles en el dataset.")
 
     # ===== MC CONTENCIÓN =====
-    columnas_mc_contencion = [
-        "Temporada","Nombre_Liga","Jugador","Pos","Equipo","Categoría_Liga",
-        "Edad","Nacionalidad","Altura","Valor_Mercado","Pie bueno",
-        "Minutos jugados","Fin de contrato",
-
-        "Score MC Genérico",
-        "Percentil Score MC Genérico",
-        "Score MC Contención",
-        "Percentil Score MC Contención",
-        "Score MC Ofensivo",
-        "Percentil Score MC Ofensivo",
-        "Score MC Box-to-Box",
-        "Percentil Score MC Box-to-Box",
-
-        "% Pases (MC_GENERICO)",
-        "Tackles/Fue Regateado Último ⅓ (MC_GENERICO)",
-        "Intercepciones (MC_GENERICO)",
-        "Recuperaciones (MC_GENERICO)",
-        "Presión Individual (MC_GENERICO)",
-        "% Pases en Campo Contrario (MC_GENERICO)",
-        "% Pases en Campo Propio (MC_GENERICO)",
-        "Progresión de Balón (MC_GENERICO)",
-        "Entradas al Área (MC_GENERICO)",
-        "Participación xG Último ⅓ (MC_GENERICO)",
-        "Conducciones Progresivas (MC_GENERICO)",
-        "Eficiencia Aérea (MC_GENERICO)",
-        "Pases Progresivos Recibidos en Campo Rival (MC_GENERICO)",
-
-        "Duelos Defensivos (MC_CONTENCION)",
-        "Tackles/Fue Regateado (MC_CONTENCION)",
-        "Intercepciones (MC_CONTENCION)",
-        "Recuperaciones (MC_CONTENCION)",
-        "Duelos Aéreos Defensivos Ganados (MC_CONTENCION)",
-        "% Duelos Aéreos Defensivos (MC_CONTENCION)",
-        "% Pases (MC_CONTENCION)",
-        "% Retención del Balón (MC_CONTENCION)",
-        "Pases Progresivos Completados (MC_CONTENCION)",
-        "% Pases Adelante Completados (MC_CONTENCION)",
-
-        "xA en Jugada (MC_OFENSIVO)",
-        "Peligro Esperado (xT) (MC_OFENSIVO)",
-        "Remates (MC_OFENSIVO)",
-        "Secuencia acabada en tiro (MC_OFENSIVO)",
-        "xG/90 (MC_OFENSIVO)",
-        "xG a Puerta (MC_OFENSIVO)",
-        "Goles sin Penaltis (MC_OFENSIVO)",
-        "Pases en Profundidad (MC_OFENSIVO)",
-        "Entradas al Área (MC_OFENSIVO)",
-
-        "Pases a Campo Contrario (MC_B2B)",
-        "Pases Progresivos Recibidos en Campo Rival (MC_B2B)",
-        "xG/90 (MC_B2B)",
-        "Remates Fuera del Área (MC_B2B)",
-        "Contribución Goleadora (MC_B2B)",
-        "xT en Juego (MC_B2B)",
-        "Profundidad en el Último ⅓ (MC_B2B)",
-        "Conducciones Progresivas (MC_B2B)",
-        "Profundidad (MC_B2B)",
-    ]
+    columnas_mc_contencion = columnas_tabla("mc")
 
     st.subheader("MC Contención")
     cols_exist = [c for c in columnas_mc_contencion if c in rankings["MC Contención"].columns]
     if cols_exist:
-        if rankings["MC Contención"].empty:
-            tabla_mc_con = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_mc_con = rankings["MC Contención"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_mc_con, key="tabla_mc_contencion", df_base=rankings["MC Contención"])
+        tabla_posicion("MC Contención", cols_exist, key="tabla_mc_contencion")
     else:
         st.write("No hay columnas de MC Contención disponibles en el dataset.")
 
     # ===== MC BOX TO BOX =====
-    columnas_mc_box = [
-    "Temporada","Nombre_Liga","Jugador","Pos","Equipo","Categoría_Liga",
-    "Edad","Nacionalidad","Altura","Valor_Mercado","Pie bueno",
-    "Minutos jugados","Fin de contrato",
-
-    "Score MC Genérico",
-    "Percentil Score MC Genérico",
-    "Score MC Contención",
-    "Percentil Score MC Contención",
-    "Score MC Ofensivo",
-    "Percentil Score MC Ofensivo",
-    "Score MC Box-to-Box",
-    "Percentil Score MC Box-to-Box",
-
-    "% Pases (MC_GENERICO)",
-    "Tackles/Fue Regateado Último ⅓ (MC_GENERICO)",
-    "Intercepciones (MC_GENERICO)",
-    "Recuperaciones (MC_GENERICO)",
-    "Presión Individual (MC_GENERICO)",
-    "% Pases en Campo Contrario (MC_GENERICO)",
-    "% Pases en Campo Propio (MC_GENERICO)",
-    "Progresión de Balón (MC_GENERICO)",
-    "Entradas al Área (MC_GENERICO)",
-    "Participación xG Último ⅓ (MC_GENERICO)",
-    "Conducciones Progresivas (MC_GENERICO)",
-    "Eficiencia Aérea (MC_GENERICO)",
-    "Pases Progresivos Recibidos en Campo Rival (MC_GENERICO)",
-
-    "Duelos Defensivos (MC_CONTENCION)",
-    "Tackles/Fue Regateado (MC_CONTENCION)",
-    "Intercepciones (MC_CONTENCION)",
-    "Recuperaciones (MC_CONTENCION)",
-    "Duelos Aéreos Defensivos Ganados (MC_CONTENCION)",
-    "% Duelos Aéreos Defensivos (MC_CONTENCION)",
-    "% Pases (MC_CONTENCION)",
-    "% Retención del Balón (MC_CONTENCION)",
-    "Pases Progresivos Completados (MC_CONTENCION)",
-    "% Pases Adelante Completados (MC_CONTENCION)",
-
-    "xA en Jugada (MC_OFENSIVO)",
-    "Peligro Esperado (xT) (MC_OFENSIVO)",
-    "Remates (MC_OFENSIVO)",
-    "Secuencia acabada en tiro (MC_OFENSIVO)",
-    "xG/90 (MC_OFENSIVO)",
-    "xG a Puerta (MC_OFENSIVO)",
-    "Goles sin Penaltis (MC_OFENSIVO)",
-    "Pases en Profundidad (MC_OFENSIVO)",
-    "Entradas al Área (MC_OFENSIVO)",
-
-    "Pases a Campo Contrario (MC_B2B)",
-    "Pases Progresivos Recibidos en Campo Rival (MC_B2B)",
-    "xG/90 (MC_B2B)",
-    "Remates Fuera del Área (MC_B2B)",
-    "Contribución Goleadora (MC_B2B)",
-    "xT en Juego (MC_B2B)",
-    "Profundidad en el Último ⅓ (MC_B2B)",
-    "Conducciones Progresivas (MC_B2B)",
-    "Profundidad (MC_B2B)",
-]
+    columnas_mc_box = columnas_tabla("mc")
 
 
     st.subheader("MC Box to Box")
     cols_exist = [c for c in columnas_mc_box if c in rankings["MC Box to Box"].columns]
     if cols_exist:
-        if rankings["MC Box to Box"].empty:
-            tabla_mc_box = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_mc_box = rankings["MC Box to Box"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_mc_box, key="tabla_mc_box", df_base=rankings["MC Box to Box"])
+        tabla_posicion("MC Box to Box", cols_exist, key="tabla_mc_box")
     else:
         st.write("No hay columnas de MC Box to Box disponibles en el dataset.")
 
     # ===== MC OFENSIVO =====
-    columnas_mc_ofensivo = [
-    "Temporada","Nombre_Liga","Jugador","Pos","Equipo","Categoría_Liga",
-    "Edad","Nacionalidad","Altura","Valor_Mercado","Pie bueno",
-    "Minutos jugados","Fin de contrato",
-
-    "Score MC Genérico",
-    "Percentil Score MC Genérico",
-    "Score MC Contención",
-    "Percentil Score MC Contención",
-    "Score MC Ofensivo",
-    "Percentil Score MC Ofensivo",
-    "Score MC Box-to-Box",
-    "Percentil Score MC Box-to-Box",
-
-    "% Pases (MC_GENERICO)",
-    "Tackles/Fue Regateado Último ⅓ (MC_GENERICO)",
-    "Intercepciones (MC_GENERICO)",
-    "Recuperaciones (MC_GENERICO)",
-    "Presión Individual (MC_GENERICO)",
-    "% Pases en Campo Contrario (MC_GENERICO)",
-    "% Pases en Campo Propio (MC_GENERICO)",
-    "Progresión de Balón (MC_GENERICO)",
-    "Entradas al Área (MC_GENERICO)",
-    "Participación xG Último ⅓ (MC_GENERICO)",
-    "Conducciones Progresivas (MC_GENERICO)",
-    "Eficiencia Aérea (MC_GENERICO)",
-    "Pases Progresivos Recibidos en Campo Rival (MC_GENERICO)",
-
-    "Duelos Defensivos (MC_CONTENCION)",
-    "Tackles/Fue Regateado (MC_CONTENCION)",
-    "Intercepciones (MC_CONTENCION)",
-    "Recuperaciones (MC_CONTENCION)",
-    "Duelos Aéreos Defensivos Ganados (MC_CONTENCION)",
-    "% Duelos Aéreos Defensivos (MC_CONTENCION)",
-    "% Pases (MC_CONTENCION)",
-    "% Retención del Balón (MC_CONTENCION)",
-    "Pases Progresivos Completados (MC_CONTENCION)",
-    "% Pases Adelante Completados (MC_CONTENCION)",
-
-    "xA en Jugada (MC_OFENSIVO)",
-    "Peligro Esperado (xT) (MC_OFENSIVO)",
-    "Remates (MC_OFENSIVO)",
-    "Secuencia acabada en tiro (MC_OFENSIVO)",
-    "xG/90 (MC_OFENSIVO)",
-    "xG a Puerta (MC_OFENSIVO)",
-    "Goles sin Penaltis (MC_OFENSIVO)",
-    "Pases en Profundidad (MC_OFENSIVO)",
-    "Entradas al Área (MC_OFENSIVO)",
-
-    "Pases a Campo Contrario (MC_B2B)",
-    "Pases Progresivos Recibidos en Campo Rival (MC_B2B)",
-    "xG/90 (MC_B2B)",
-    "Remates Fuera del Área (MC_B2B)",
-    "Contribución Goleadora (MC_B2B)",
-    "xT en Juego (MC_B2B)",
-    "Profundidad en el Último ⅓ (MC_B2B)",
-    "Conducciones Progresivas (MC_B2B)",
-    "Profundidad (MC_B2B)",
-]
+    columnas_mc_ofensivo = columnas_tabla("mc")
 
 
     st.subheader("MC Ofensivo")
     cols_exist = [c for c in columnas_mc_ofensivo if c in rankings["MC Ofensivo"].columns]
     if cols_exist:
-        if rankings["MC Ofensivo"].empty:
-            tabla_mc_of = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_mc_of = rankings["MC Ofensivo"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_mc_of, key="tabla_mc_ofensivo", df_base=rankings["MC Ofensivo"])
+        tabla_posicion("MC Ofensivo", cols_exist, key="tabla_mc_ofensivo")
     else:
         st.write("No hay columnas de MC Ofensivo disponibles en el dataset.")
 
     # ===== EXTREMOS =====
-    columnas_extremos = [
-        "Temporada","Nombre_Liga","Jugador","Pos","Equipo","Categoría_Liga",
-        "Edad","Nacionalidad","Altura","Valor_Mercado","Pie bueno",
-        "Minutos jugados","Fin de contrato",
-
-        "Score Extremo Genérico",
-        "Percentil Score Extremo Genérico",
-        "Score Extremo Wide Out",
-        "Percentil Score Extremo Wide Out",
-        "Score Extremo Incorporación",
-        "Percentil Score Extremo Incorporación",
-        "Score Extremo Combinativo",
-        "Percentil Score Extremo Combinativo",
-        "Score Extremos Total",
-        "Percentil Score Extremos Total",
-
-        "Acciones Agresivas (EXT_GENERICO)",
-        "Duelos Defensivos (EXT_GENERICO)",
-        "Presión Individual (EXT_GENERICO)",
-        "xG/90 (EXT_GENERICO)",
-        "Centros (EXT_GENERICO)",
-        "% Centros Completados (EXT_GENERICO)",
-        "Contribución Goleadora (EXT_GENERICO)",
-        "Asistencias Esperadas (EXT_GENERICO)",
-        "Peligro Esperado (xT) (EXT_GENERICO)",
-        "Regates Completados Campo Contrario (EXT_GENERICO)",
-        "% Regates Completados Último ⅓ (EXT_GENERICO)",
-        "Profundidad (EXT_GENERICO)",
-
-        "Participación xG Último ⅓ (EXT_WIDEOUT)",
-        "Profundidad (EXT_WIDEOUT)",
-        "Conducción y Ocasión (EXT_WIDEOUT)",
-        "Toques (EXT_WIDEOUT)",
-        "xA de Centros (EXT_WIDEOUT)",
-        "xT Regates (EXT_WIDEOUT)",
-        "Regates Intentados Último ⅓ (EXT_WIDEOUT)",
-        "% Regates Completados Último ⅓ (EXT_WIDEOUT)",
-
-        "Goles sin Penaltis (EXT_INCORPORACION)",
-        "Finalización (EXT_INCORPORACION)",
-        "xG por Remate (EXT_INCORPORACION)",
-        "Toques en Área Rival (EXT_INCORPORACION)",
-        "Remates a Puerta (EXT_INCORPORACION)",
-        "Fueras de Juego (EXT_INCORPORACION)",
-        "% Toques de Balón en el Área Rival en su Equipo (EXT_INCORPORACION)",
-        "Profundidad (EXT_INCORPORACION)",
-
-        "xT Pases por 100 Pases (EXT_COMBINATIVO)",
-        "xT en Juego (EXT_COMBINATIVO)",
-        "Progresión de Balón (EXT_COMBINATIVO)",
-        "Asistencias Esperadas (EXT_COMBINATIVO)",
-        "Contribución Goleadora (EXT_COMBINATIVO)",
-        "Ocasiones Creadas (EXT_COMBINATIVO)",
-    ]
+    columnas_extremos = columnas_tabla("extremos")
 
 
     st.subheader("Extremos Izquierdos")
     cols_exist = [c for c in columnas_extremos if c in rankings["Extremo Izquierdo"].columns]
     if cols_exist:
-        if rankings["Extremo Izquierdo"].empty:
-            tabla_ei = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_ei = rankings["Extremo Izquierdo"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_ei, key="tabla_extremos_izq", df_base=rankings["Extremo Izquierdo"])
+        tabla_posicion("Extremo Izquierdo", cols_exist, key="tabla_extremos_izq")
     else:
         st.write("No hay columnas de Extremos Izquierdos disponibles en el dataset.")
 
     st.subheader("Extremos Derechos")
     cols_exist = [c for c in columnas_extremos if c in rankings["Extremo Derecho"].columns]
     if cols_exist:
-        if rankings["Extremo Derecho"].empty:
-            tabla_ed = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_ed = rankings["Extremo Derecho"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_ed, key="tabla_extremos_der", df_base=rankings["Extremo Derecho"])
+        tabla_posicion("Extremo Derecho", cols_exist, key="tabla_extremos_der")
     else:
         st.write("No hay columnas de Extremos Derechos disponibles en el dataset.")
 
     # ===== DELANTEROS =====
-    columnas_delantero = [
-        "Temporada","Nombre_Liga","Jugador","Pos","Equipo","Categoría_Liga",
-        "Edad","Nacionalidad","Altura","Valor_Mercado","Pie bueno",
-        "Minutos jugados","Fin de contrato",
-
-        "Score Delantero",
-        "Percentil Score Delantero",
-        "Score 9",
-        "Percentil Score 9",
-        "Score Segundo Delantero",
-        "Percentil Score Segundo Delantero",
-        "Score Total",
-        "Percentil Score Total",
-
-       'Goles sin Penaltis (DEL_DELANTERO)', 'Remates (DEL_DELANTERO)',
-       'xG por Remate (DEL_DELANTERO)', '% Remates a Puerta (DEL_DELANTERO)',
-       'xG/90 (DEL_DELANTERO)', 'Pérdidas de Balón (DEL_DELANTERO)',
-       '% Retención del Balón en Campo Rival (DEL_DELANTERO)',
-       'Toques (DEL_DELANTERO)', '% Regates Completados (DEL_DELANTERO)',
-       'Peligro Esperado (xT) (DEL_DELANTERO)',
-       '% Duelos Aéreos Ganados Campo Rival (DEL_DELANTERO)',
-       'Distancia Media de Conducción (DEL_DELANTERO)',
-       'Presión Individual Campo Rival (DEL_DELANTERO)',
-       '% Duelos Aéreos Ganados Campo Rival (DEL_9)',
-       'Duelos Aéreos Totales Campo Rival (DEL_9)',
-       'xG por Goles sin Penaltis (DEL_9)', 'xG/90 (DEL_9)',
-       'Pases Largos Recibidos (DEL_9)',
-       'Pases Progresivos Recibidos en el Área (DEL_9)',
-       'Participación xG (DEL_9)',
-       '% Retención del Balón en Campo Rival (DEL_9)',
-       'xT en Juego (DEL_SEGUNDO)', 'Asistencias Esperadas (DEL_SEGUNDO)',
-       '% Pases en Juego en el Área Rival en su Equipo (DEL_SEGUNDO)',
-       'Pases Completados al Área en Juego (DEL_SEGUNDO)',
-       'Conducciones Progresivas (DEL_SEGUNDO)',
-       'Conducción y Tiro (DEL_SEGUNDO)',
-       'Progreso Medio de Conducciones (DEL_SEGUNDO)',
-    ]
+    columnas_delantero = columnas_tabla("delanteros")
 
     st.subheader("Delanteros")
     cols_exist = [c for c in columnas_delantero if c in rankings["Delantero"].columns]
     if cols_exist:
-        if rankings["Delantero"].empty:
-            tabla_del = pd.DataFrame(columns=cols_exist)
-        else:
-            tabla_del = rankings["Delantero"][cols_exist].head(10)
-        mostrar_tabla_aggrid(tabla_del, key="tabla_delanteros", df_base=rankings["Delantero"])
+        tabla_posicion("Delantero", cols_exist, key="tabla_delanteros")
     else:
         st.write("No hay columnas de Delanteros disponibles en el dataset.")
 